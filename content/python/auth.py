@@ -1,11 +1,18 @@
 # Copyright: 2024 Ibrahem Mouhamad
 
 import abc
+import itertools
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from consts import Consts
 
 import logging
 logger = logging.getLogger('my_logger')
 
-logging.basicConfig()
 
 class Auth(abc.ABC):
     """
@@ -35,6 +42,15 @@ class Auth(abc.ABC):
         """
         headers["Authorization"] = f"{self.token_type} {self.token}"
 
+    def select(self, url: str) -> "Auth":
+        """
+        The authentication to use for a request, and for the following pages of its paginated response.
+
+        :param url: The URL of the (first) request.
+        :return: This authentication, pools of authentications return one of their members.
+        """
+        return self
+
 
 class Token(Auth):
     """
@@ -45,6 +61,189 @@ class Token(Auth):
         assert isinstance(token, str)
         assert len(token) > 0
         self._token = token
+        self._authorization = f"{self.token_type} {token}"
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        return self._token
+
+    def authentication(self, headers: dict) -> None:
+        headers["Authorization"] = self._authorization
+
+
+class AppAuth(Auth):
+    """
+    This class is used to authenticate as a GitHub App, using a JWT signed with the app's private key.
+
+    The JWT is signed once and reused until it is about to expire.
+    Signing requires the optional `PyJWT` package (with `cryptography` for RS256).
+    """
+
+    def __init__(
+        self,
+        app_id: int | str,
+        private_key: str,
+        jwt_expiry: int = Consts['DEFAULT_JWT_EXPIRY'],
+        jwt_issued_at: int = Consts['DEFAULT_JWT_ISSUED_AT'],
+        base_url: str = Consts['DEFAULT_BASE_URL'],
+    ):
+        """
+        :param app_id: The GitHub App ID (or client ID).
+        :param private_key: The PEM encoded private key of the app.
+        :param jwt_expiry: Lifetime of the JWT in seconds, at most 600.
+        :param jwt_issued_at: Offset of the JWT issue time in seconds, negative to allow for clock drift.
+        :param base_url: Base URL for GitHub API, used to mint installation tokens.
+        """
+        assert isinstance(app_id, (int, str)), app_id
+        assert isinstance(private_key, str) and len(private_key) > 0
+        assert 0 < jwt_expiry <= 600, jwt_expiry
+        self.app_id = app_id
+        self.base_url = base_url
+        self._private_key = private_key
+        self._jwt_expiry = jwt_expiry
+        self._jwt_issued_at = jwt_issued_at
+        self._jwt: Optional[Tuple[str, float]] = None
+        self._installations: Dict[int, "AppInstallationAuth"] = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def token_type(self) -> str:
+        return "Bearer"
+
+    @property
+    def token(self) -> str:
+        """
+        The JWT, signed again only when less than a minute of its lifetime is left.
+        """
+        with self._lock:
+            if self._jwt is None or self._jwt[1] - time.time() < 60:
+                self._jwt = self.create_jwt()
+            return self._jwt[0]
+
+    def create_jwt(self) -> Tuple[str, float]:
+        """
+        Sign a new JWT.
+
+        :return: Tuple containing the JWT and its expiry time (epoch seconds).
+        """
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("GitHub App authentication requires the `PyJWT` package") from e
+
+        now = int(time.time())
+        expires_at = now + self._jwt_expiry
+        payload = {
+            "iat": now + self._jwt_issued_at,
+            "exp": expires_at,
+            "iss": str(self.app_id),
+        }
+        encoded = jwt.encode(payload, key=self._private_key, algorithm="RS256")
+        if isinstance(encoded, bytes):
+            encoded = encoded.decode("utf-8")
+        return encoded, expires_at
+
+    def get_installation_id(
+        self,
+        account: str,
+        timeout: int = Consts['DEFAULT_TIMEOUT'],
+        user_agent: str = Consts['DEFAULT_USER_AGENT'],
+        verify: bool | str = True,
+    ) -> Optional[int]:
+        """
+        Find the installation of the app covering an account.
+
+        :calls: `GET /repos/{owner}/{repo}/installation`, `GET /orgs/{org}/installation` or `GET /users/{username}/installation`
+                <https://docs.github.com/en/rest/apps/apps#get-a-repository-installation-for-the-authenticated-app>
+        :param account: The resource of the account, `/repos/{owner}/{repo}`, `/orgs/{org}` or `/users/{username}`.
+        :param timeout: Timeout for the request in seconds.
+        :param user_agent: User agent string for the request.
+        :param verify: SSL verification (can be `True`, `False`, or a path to a CA_BUNDLE file).
+        :return: The installation ID, or None if the app is not installed on the account.
+        """
+        import requests
+
+        headers = {
+            "Accept": Consts['headerJSON'],
+            "User-Agent": user_agent,
+        }
+        self.authentication(headers)
+        response = requests.get(
+            f"{self.base_url}{account}/installation",
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            raise Exception(f'{response.status_code} {response.text}')
+        return response.json()["id"]
+
+    def get_installation_auth(self, installation_id: int, **kwargs) -> "AppInstallationAuth":
+        """
+        Get the authentication of an installation of the app, one instance (and token cache) per installation.
+
+        :param installation_id: The installation ID.
+        :param kwargs: see `AppInstallationAuth` for more arguments, only used when the instance is created.
+        :return: The installation authentication.
+        """
+        with self._lock:
+            if installation_id not in self._installations:
+                self._installations[installation_id] = AppInstallationAuth(self, installation_id, **kwargs)
+            return self._installations[installation_id]
+
+
+class AppInstallationAuth(Auth):
+    """
+    This class is used to authenticate as an installation of a GitHub App.
+
+    The installation token is minted on first use, then refreshed in a background thread
+    `refresh_margin` seconds before it expires, so requests do not wait for a new token.
+    A failed refresh is retried with a backoff from `Consts['TOKEN_REFRESH_RETRY_MIN']` up to
+    `Consts['TOKEN_REFRESH_RETRY_MAX']` seconds while the current token is valid; once it has
+    expired, the next request mints a token inline instead.
+    """
+
+    def __init__(
+        self,
+        app_auth: AppAuth,
+        installation_id: int,
+        refresh_margin: int = Consts['DEFAULT_TOKEN_REFRESH_MARGIN'],
+        timeout: int = Consts['DEFAULT_TIMEOUT'],
+        user_agent: str = Consts['DEFAULT_USER_AGENT'],
+        verify: bool | str = True,
+    ):
+        """
+        :param app_auth: The authentication of the app.
+        :param installation_id: The installation ID.
+        :param refresh_margin: Seconds before expiry at which the token is refreshed.
+        :param timeout: Timeout for token requests in seconds.
+        :param user_agent: User agent string for token requests.
+        :param verify: SSL verification for token requests (can be `True`, `False`, or a path to a CA_BUNDLE file).
+        """
+        assert isinstance(app_auth, AppAuth), app_auth
+        assert isinstance(installation_id, int), installation_id
+        assert refresh_margin >= 0, refresh_margin
+        self.app_auth = app_auth
+        self.installation_id = installation_id
+        self._refresh_margin = refresh_margin
+        self._timeout = timeout
+        self._user_agent = user_agent
+        self._verify = verify
+        self._token: Optional[str] = None
+        self._authorization: Optional[str] = None
+        self._expires_at: float = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._retry_delay: float = 0
+        self._closed = False
+        # (remaining, limit) of the last response, kept per installation by the clients using it
+        self.rate_limiting: Optional[Tuple[int, int]] = None
 
     @property
     def token_type(self) -> str:
@@ -52,4 +251,216 @@ class Token(Auth):
 
     @property
     def token(self) -> str:
+        self.__ensure_token()
         return self._token
+
+    @property
+    def expires_at(self) -> float:
+        """
+        Expiry time (epoch seconds) of the current token, 0 if no token was minted yet.
+        """
+        return self._expires_at
+
+    def authentication(self, headers: dict) -> None:
+        self.__ensure_token()
+        headers["Authorization"] = self._authorization
+
+    def __ensure_token(self) -> None:
+        """
+        Mint a token inline, only if there is none or the background refresh did not renew it in time.
+        """
+        if self._token is not None and self._expires_at - time.time() > 0:
+            return
+        with self._lock:
+            if self._token is None or self._expires_at - time.time() <= 0:
+                self.__refresh()
+
+    def __mint(self) -> Tuple[str, float]:
+        """
+        Create a new installation access token.
+
+        :calls: `POST /app/installations/{installation_id}/access_tokens <https://docs.github.com/en/rest/apps/apps#create-an-installation-access-token-for-an-app>`
+        :return: Tuple containing the token and its expiry time (epoch seconds).
+        """
+        import requests
+
+        headers = {
+            "Accept": Consts['headerJSON'],
+            "User-Agent": self._user_agent,
+        }
+        self.app_auth.authentication(headers)
+        response = requests.post(
+            f"{self.app_auth.base_url}/app/installations/{self.installation_id}/access_tokens",
+            headers=headers,
+            timeout=self._timeout,
+            verify=self._verify,
+        )
+        if response.status_code >= 400:
+            raise Exception(f'{response.status_code} {response.text}')
+        data = response.json()
+        expires_at = datetime.strptime(data["expires_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        return data["token"], expires_at.timestamp()
+
+    def __refresh(self) -> None:
+        """
+        Mint a new token and schedule its background refresh. Must be called with the lock held.
+        """
+        token, expires_at = self.__mint()
+        self._token = token
+        self._authorization = f"{self.token_type} {token}"
+        self._expires_at = expires_at
+        logger.debug(f"Installation {self.installation_id} token valid until {datetime.fromtimestamp(expires_at, timezone.utc)}")
+        self.__schedule(max(expires_at - self._refresh_margin - time.time(), 0))
+
+    def __schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._closed:
+            return
+        self._timer = threading.Timer(delay, self.__background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def __background_refresh(self) -> None:
+        with self._lock:
+            try:
+                self.__refresh()
+                self._retry_delay = 0
+            except Exception as e:
+                remaining = self._expires_at - time.time()
+                if remaining <= 0:
+                    # stop retrying, the next request mints a token inline
+                    logger.warning(f"Failed to refresh the expired token of installation {self.installation_id}: {e}")
+                    return
+                # the current token stays in use until it expires, try again with a backoff
+                self._retry_delay = min(max(Consts['TOKEN_REFRESH_RETRY_MIN'], 2 * self._retry_delay), Consts['TOKEN_REFRESH_RETRY_MAX'])
+                logger.warning(f"Failed to refresh the token of installation {self.installation_id}, retrying in {self._retry_delay}s: {e}")
+                self.__schedule(min(self._retry_delay, remaining))
+
+    def close(self) -> None:
+        """
+        Stop the background refresh.
+        """
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class AppInstallationPool(Auth):
+    """
+    This class spreads requests over several installations of GitHub Apps.
+
+    An installation token only grants access to the account (user or organization) the app is
+    installed on, so every request uses an installation of the account owning the requested
+    resource: the ones given in `owners`, otherwise the ones found with
+    `GET /repos/{owner}/{repo}/installation` the first time the account is requested.
+    Installations of the same account, e.g. of several apps, are used round-robin and add up
+    their rate limits. Requests not scoped to an account (e.g. search), or to an account none of
+    the apps is installed on, use all installations round-robin and can only access public data.
+
+    `select` picks the installation once for a request and the following pages of its
+    paginated response, so a stream is never split over tokens and rate limits.
+
+    The lookup of an account is made by the first request to it, which waits for one
+    `GET .../installation` request per app of the pool. List the accounts in `owners` to avoid it.
+    """
+
+    # the account of a request, e.g. `/repos/{owner}/{repo}` of `/repos/{owner}/{repo}/commits`
+    _ACCOUNT_PATTERN = re.compile(r'/(repos|orgs|users)/([^/?#]+)(?:/([^/?#]+))?')
+
+    def __init__(
+        self,
+        installations: List[AppInstallationAuth],
+        owners: Optional[Dict[str, List[int]]] = None,
+        timeout: int = Consts['DEFAULT_TIMEOUT'],
+        user_agent: str = Consts['DEFAULT_USER_AGENT'],
+        verify: bool | str = True,
+    ):
+        """
+        :param installations: The installation authentications, e.g. from `AppAuth.get_installation_auth`.
+        :param owners: Optional mapping of account logins to the IDs of their installations in the pool,
+                       accounts not listed are looked up on first use.
+        :param timeout: Timeout for the installation lookups in seconds, usually the one of the client.
+        :param user_agent: User agent string for the installation lookups.
+        :param verify: SSL verification for the installation lookups, usually the one of the client.
+        """
+        assert len(installations) > 0, "need at least one installation"
+        for installation in installations:
+            assert isinstance(installation, AppInstallationAuth), installation
+        self.installations = list(installations)
+        self._timeout = timeout
+        self._user_agent = user_agent
+        self._verify = verify
+        self._by_id: Dict[int, AppInstallationAuth] = {i.installation_id: i for i in self.installations}
+        # per account login (None for requests not scoped to an account): its installations, round-robin
+        self._cycles: Dict[Optional[str], Iterator[AppInstallationAuth]] = {None: itertools.cycle(self.installations)}
+        for owner, installation_ids in (owners or {}).items():
+            assert len(installation_ids) > 0, owner
+            for installation_id in installation_ids:
+                assert installation_id in self._by_id, installation_id
+            self._cycles[owner.lower()] = itertools.cycle([self._by_id[i] for i in installation_ids])
+        self._lock = threading.Lock()
+
+    def __resolve(self, owner: str, account: str) -> Iterator[AppInstallationAuth]:
+        """
+        Find the installations of the pool covering an account, asking each app of the pool once.
+        """
+        apps = {id(installation.app_auth): installation.app_auth for installation in self.installations}
+        installations = []
+        for app in apps.values():
+            installation_id = app.get_installation_id(
+                account,
+                timeout=self._timeout,
+                user_agent=self._user_agent,
+                verify=self._verify,
+            )
+            if installation_id in self._by_id:
+                installations.append(self._by_id[installation_id])
+        if not installations:
+            logger.debug(f"No installation of the pool covers {owner}, using all installations")
+            return self._cycles[None]
+        logger.debug(f"Installations {[i.installation_id for i in installations]} cover {owner}")
+        return itertools.cycle(installations)
+
+    def select(self, url: str) -> AppInstallationAuth:
+        """
+        Pick an installation of the account owning the requested resource.
+
+        :param url: The URL of the (first) request.
+        :return: The installation authentication.
+        """
+        match = self._ACCOUNT_PATTERN.search(url.split("?", 1)[0])
+        owner = match.group(2).lower() if match else None
+        with self._lock:
+            cycle = self._cycles.get(owner)
+        if cycle is None:
+            kind, name, repo = match.groups()
+            if kind == "repos":
+                account = f"/repos/{name}/{repo}" if repo else f"/users/{name}"
+            else:
+                account = f"/{kind}/{name}"
+            resolved = self.__resolve(owner, account)
+            with self._lock:
+                cycle = self._cycles.setdefault(owner, resolved)
+        with self._lock:
+            return next(cycle)
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        return self.select("").token
+
+    def authentication(self, headers: dict) -> None:
+        self.select("").authentication(headers)
+
+    def close(self) -> None:
+        """
+        Stop the background refresh of all installations.
+        """
+        for installation in self.installations:
+            installation.close()
@@ -0,0 +1,89 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+"""
+Benchmarks of the cold start of short-lived workers: importing the client, and
+creating clients up to their first request.
+
+Usage::
+
+    cd content/python
+    python benchmarks/bench_startup.py [--runs N] [--token TOKEN]
+
+Without a token the first request is not sent, only the client and its connection
+(session, adapter, retry) are set up, which is what the first request pays for on top
+of the network round trip.
+"""
+
+from typing import List, Optional
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import sys, time
+start = time.perf_counter()
+import github_client
+print((time.perf_counter() - start) * 1000)
+print(",".join(m for m in ("requests", "urllib3", "typing_extensions", "tarfile") if m in sys.modules))
+"""
+
+FIRST_REQUEST = """
+import sys, time
+start = time.perf_counter()
+import github_client
+from auth import Token
+token = sys.argv[1] if len(sys.argv) > 1 else None
+timings = []
+for _ in range(2):
+    begin = time.perf_counter()
+    g = github_client.Github(auth=Token(token or "benchmark"), seconds_between_requests=None)
+    if token:
+        list(g.pages("/rate_limit"))
+    else:
+        g._Github__getConnection()
+    timings.append((time.perf_counter() - begin) * 1000)
+print((time.perf_counter() - start) * 1000)
+print(" ".join(f"{t:.1f}" for t in timings))
+"""
+
+
+def run(code: str, arguments: Optional[List[str]] = None) -> List[str]:
+    """
+    Run code in a fresh interpreter, so every run is a cold start.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", code] + (arguments or []),
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return output.strip().splitlines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per benchmark")
+    parser.add_argument("--token", help="send a real first request (GET /rate_limit) with this token")
+    args = parser.parse_args()
+
+    imports = [run(IMPORT) for _ in range(args.runs)]
+    print(f"import github_client       {statistics.median(float(r[0]) for r in imports):8.1f} ms (median)")
+    print(f"  heavy modules loaded       {imports[0][1] if len(imports[0]) > 1 else 'none'}")
+
+    starts = [run(FIRST_REQUEST, [args.token] if args.token else None) for _ in range(args.runs)]
+    first = statistics.median(float(r[1].split()[0]) for r in starts)
+    second = statistics.median(float(r[1].split()[1]) for r in starts)
+    total = statistics.median(float(r[0]) for r in starts)
+    what = "first request" if args.token else "first connection"
+    print(f"1st client to {what:<16} {first:8.1f} ms (median)")
+    print(f"2nd client to {what:<16} {second:8.1f} ms (median)")
+    print(f"import + both clients      {total:8.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
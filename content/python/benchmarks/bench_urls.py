@@ -0,0 +1,88 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+"""
+Micro-benchmarks of the URL handling done for every page of a paginated request.
+
+Usage::
+
+    cd content/python
+    python benchmarks/bench_urls.py [--number N]
+"""
+
+from typing import Any, Callable, Dict
+import argparse
+import os
+import sys
+import timeit
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import Token
+from github_client import Github
+from utils import add_parameters_to_url, parseLinkHeader, UrlTemplate
+
+LINK_HEADER = {
+    "link": '<https://api.github.com/repositories/2325298/commits?per_page=100&page=2>; rel="next", '
+            '<https://api.github.com/repositories/2325298/commits?per_page=100&page=13140>; rel="last"',
+}
+NEXT_URL = "https://api.github.com/repositories/2325298/commits?per_page=100&page=2"
+PARAMETERS = {"sha": "master", "since": "2023-01-01T00:00:00Z", "per_page": 100}
+
+
+def legacy_add_parameters_to_url(url: str, parameters: Dict[str, Any]) -> str:
+    """ The full `urlparse` -> `parse_qs` -> `urlencode` round trip used before the fast paths. """
+    scheme, netloc, url, params, query, fragment = urllib.parse.urlparse(url)
+    url_params = urllib.parse.parse_qs(query)
+    url_params.update(**{k: v if isinstance(v, list) else [v] for k, v in parameters.items()})
+    parameter_list = [(key, value) for key, values in url_params.items() for value in values]
+    url = urllib.parse.urlunparse((scheme, netloc, url, params, "", fragment))
+    if len(parameter_list) == 0:
+        return url
+    return f"{url}?{urllib.parse.urlencode(parameter_list)}"
+
+
+def legacy_parseLinkHeader(headers: Dict[str, Any]) -> Dict[str, str]:
+    """ The string-splitting parser used before the single-pass parser. """
+    links = {}
+    if "link" in headers and isinstance(headers["link"], str):
+        for linkHeader in headers["link"].split(", "):
+            url, rel, *rest = linkHeader.split("; ")
+            links[rel[5:-1]] = url[1:-1]
+    return links
+
+
+def legacy_makeAbsoluteUrl(url: str) -> str:
+    """ The parse-and-assert host validation every absolute URL went through. """
+    o = urllib.parse.urlparse(url)
+    assert o.hostname in ["api.github.com", "uploads.github.com", "status.github.com", "github.com"]
+    assert o.path.startswith(("", "/api/", "/login/oauth"))
+    assert o.port is None
+    url = o.path
+    if o.query != "":
+        url += f"?{o.query}"
+    return url
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000, help="iterations per benchmark")
+    number = parser.parse_args().number
+
+    makeAbsoluteUrl = Github(auth=Token("benchmark"))._Github__makeAbsoluteUrl
+
+    benchmarks: Dict[str, Callable[[], Any]] = {
+        "parseLinkHeader (legacy)": lambda: legacy_parseLinkHeader(LINK_HEADER),
+        "parseLinkHeader": lambda: parseLinkHeader(LINK_HEADER),
+        "first page url (legacy)": lambda: legacy_add_parameters_to_url("/repos/torvalds/linux/commits", PARAMETERS),
+        "first page url (template)": lambda: UrlTemplate("/repos/torvalds/linux/commits", PARAMETERS).url,
+        "next page url (legacy)": lambda: legacy_add_parameters_to_url(legacy_makeAbsoluteUrl(NEXT_URL), {}),
+        "next page url": lambda: add_parameters_to_url(makeAbsoluteUrl(NEXT_URL), {}),
+    }
+    for name, function in benchmarks.items():
+        seconds = timeit.timeit(function, number=number)
+        print(f"{name:<30} {seconds / number * 1e6:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Any, Dict
+import json
+import os
+import re
+import threading
+
+import logging
+logger = logging.getLogger('my_logger')
+
+_FULL_SHA = re.compile(r'[0-9a-f]{40}|[0-9a-f]{64}')
+_SHORT_SHA = re.compile(r'[0-9a-f]{4,63}')
+
+
+class CommitCache:
+    """
+    A permanent cache of commit details, keyed by full commit SHA.
+
+    Commit details are immutable, so entries never expire. The same commit reached
+    through different branches or forks is stored once. Entries are kept in memory as
+    JSON text and, if a directory is given, also as one JSON file per commit so they
+    survive restarts and can be shared between processes. Every `get` returns a new
+    copy, callers may modify it freely.
+
+    Abbreviated SHAs are only unique within a repository, so they are resolved through
+    repository-scoped aliases (see `key`). Branch and tag names are never cached since
+    they move.
+
+    Attributes:
+        directory (Optional[str]): Directory holding the `{sha}.json` files, if any.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        :param directory: Optional directory to persist the cached commits to.
+        """
+        self.directory = directory
+        self.__entries: Dict[str, str] = dict()
+        self.__aliases: Dict[str, str] = dict()
+        self.__lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(owner: str, repo: str, ref: str) -> Optional[str]:
+        """
+        The cache key of a commit reference.
+
+        :param owner: The owner of the repository the reference is resolved in.
+        :param repo: The name of the repository the reference is resolved in.
+        :param ref: A full or abbreviated commit SHA, or a branch/tag name.
+        :return: The full SHA, a repository-scoped alias for an abbreviated SHA,
+                 or None for references that cannot be cached.
+        """
+        ref = ref.lower()
+        if _FULL_SHA.fullmatch(ref):
+            return ref
+        if _SHORT_SHA.fullmatch(ref):
+            return f"{owner}/{repo}@{ref}".lower()
+        return None
+
+    def __path(self, sha: str) -> str:
+        return os.path.join(self.directory, f"{sha}.json")
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        :param key: A full commit SHA or an alias, see `key`.
+        :return: A copy of the cached commit details, or None.
+        """
+        if key is None:
+            return None
+        with self.__lock:
+            sha = self.__aliases.get(key, key)
+            text = self.__entries.get(sha)
+        if text is None and self.directory is not None and _FULL_SHA.fullmatch(sha):
+            try:
+                with open(self.__path(sha), encoding='utf-8') as f:
+                    text = f.read()
+            except FileNotFoundError:
+                return None
+            with self.__lock:
+                self.__entries[sha] = text
+        if text is None:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def put(self, commit: Dict[str, Any], alias: Optional[str] = None) -> None:
+        """
+        Cache the details of a commit under its SHA.
+
+        :param commit: The commit as returned by `GET /repos/{owner}/{repo}/commits/{ref}`.
+        :param alias: Optional alias of the commit, see `key`. Only pass the alias of a reference that is
+                      a prefix of the commit SHA, a branch or tag named like a SHA must not be aliased.
+        """
+        sha = commit['sha']
+        text = json.dumps(commit)
+        with self.__lock:
+            self.__entries[sha] = text
+            if alias is not None and alias != sha:
+                self.__aliases[alias] = sha
+        if self.directory is not None:
+            # write then rename so concurrent readers never see a partial file
+            path = self.__path(sha)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temporary, path)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
@@ -0,0 +1,56 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Any, Dict, List, Iterator
+
+from page import Page
+
+
+class Comparison:
+    """
+    The result of comparing two commits, streamed page by page.
+
+    The first page is fetched when the comparison is created: it holds the comparison
+    metadata and the changed files of the whole range. The commits are then streamed
+    by iterating over the comparison, which fetches the remaining pages on demand.
+
+    Attributes:
+        status (str): One of `ahead`, `behind`, `identical` or `diverged`.
+        ahead_by (int): Number of commits of `head` not in `base`.
+        behind_by (int): Number of commits of `base` not in `head`.
+        total_commits (int): Number of commits in the range, i.e. the number of streamed commits.
+        base_commit (Dict[str, Any]): The base commit.
+        merge_base_commit (Dict[str, Any]): The best common ancestor of base and head.
+        files (List[Dict[str, Any]]): The changed files of the whole range, at most 300 (the API limit),
+            so the list is incomplete for larger ranges.
+        html_url (Optional[str]): The comparison page on GitHub.
+    """
+
+    def __init__(self, pages: Iterator[Page]):
+        """
+        :param pages: The pages of a `GET /repos/{owner}/{repo}/compare/{basehead}` response.
+        """
+        self.__pages = pages
+        self.__first: Optional[Page] = next(pages)
+        data: Dict[str, Any] = self.__first.data
+        self.status: str = data.get('status')
+        self.ahead_by: int = data.get('ahead_by')
+        self.behind_by: int = data.get('behind_by')
+        self.total_commits: int = data.get('total_commits')
+        self.base_commit: Dict[str, Any] = data.get('base_commit')
+        self.merge_base_commit: Dict[str, Any] = data.get('merge_base_commit')
+        self.html_url: Optional[str] = data.get('html_url')
+        # files are only listed on the first page, but cover the entire comparison
+        self.files: List[Dict[str, Any]] = data.get('files') or []
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the commits of the range, oldest first. The commits can only be iterated once.
+        """
+        first, self.__first = self.__first, None
+        assert first is not None, "the commits of a comparison can only be iterated once"
+        yield from first.data.get('commits') or []
+        for page in self.__pages:
+            yield from page.data.get('commits') or []
+
+    def __repr__(self) -> str:
+        return f"Comparison(status={self.status!r}, total_commits={self.total_commits}, files={len(self.files)})"
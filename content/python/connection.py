@@ -1,14 +1,24 @@
 # Copyright: 2024 Ibrahem Mouhamad
 
-from typing import Optional, Any, Dict, Union, ItemsView
-import requests
-from urllib3.util import Retry
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Any, BinaryIO, Collection, Dict, Tuple, Union, ItemsView
 import io
+import os
+import threading
+import urllib.parse
+
+# `requests` is imported when the first connection is created, to keep imports cheap
+if TYPE_CHECKING:
+    import requests
+    from urllib3.util import Retry
 
 import logging
 logger = logging.getLogger('my_logger')
 
-logging.basicConfig()
+# process-wide sessions shared by connections, see `shared_session`
+_sessions: Dict[Tuple[Any, ...], Tuple[requests.Session, requests.adapters.HTTPAdapter]] = dict()
+_sessions_lock = threading.Lock()
 
 class RequestsResponse:
     """
@@ -60,6 +70,87 @@ def noopAuth(request: requests.models.PreparedRequest) -> requests.models.Prepar
     """
     return request
 
+def _new_session(
+    retry: Union[int, Retry],
+    pool_size: int,
+    cookies: bool = True,
+) -> Tuple[requests.Session, requests.adapters.HTTPAdapter]:
+    """
+    Create a session with an HTTPS adapter.
+
+    Args:
+        retry (Union[int, Retry]): Retry configuration or number of retries.
+        pool_size (int): The maximum size of the connection pool.
+        cookies (bool): Whether the session keeps the cookies set by responses.
+
+    Returns:
+        Tuple[requests.Session, requests.adapters.HTTPAdapter]: The session and its adapter.
+    """
+    import http.cookiejar
+    import requests.adapters
+
+    session = requests.Session()
+    session.auth = noopAuth
+    if not cookies:
+        # an empty allow-list rejects every cookie, none is stored or sent
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(
+        max_retries=retry,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+    )
+    session.mount("https://", adapter)
+    return session, adapter
+
+def shared_session(
+    retry: Union[int, Retry],
+    pool_size: int,
+) -> Tuple[requests.Session, requests.adapters.HTTPAdapter]:
+    """
+    Get the process-wide session for a retry and pool configuration, creating it on first use.
+
+    Connections (and `Github` instances) with the same configuration reuse the same session,
+    adapter and connection pools instead of building and warming up their own. Since the
+    session is shared between tokens and apps, it does not keep cookies.
+
+    The sessions stay open when their connections are closed, `close_shared_sessions`
+    releases their sockets.
+
+    Args:
+        retry (Union[int, Retry]): Retry configuration or number of retries.
+        pool_size (int): The maximum size of the connection pool.
+
+    Returns:
+        Tuple[requests.Session, requests.adapters.HTTPAdapter]: The shared session and its adapter.
+    """
+    # Retry objects are compared by identity, the registry keeps them alive
+    key = (retry if isinstance(retry, int) else id(retry), pool_size)
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = _new_session(retry, pool_size, cookies=False)
+        return _sessions[key]
+
+def close_shared_sessions() -> None:
+    """
+    Close all process-wide sessions and release their sockets, e.g. before a worker shuts down.
+
+    Connections using them must not be used afterwards, new connections create new sessions.
+    """
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session, _ in sessions:
+        session.close()
+
+def _reset_shared_sessions() -> None:
+    # pooled sockets must not be shared with a forked child
+    global _sessions_lock
+    _sessions.clear()
+    _sessions_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_sessions)
+
 class HTTPSRequestsConnectionClass:
     retry: Union[int, Retry]
 
@@ -84,6 +175,7 @@ class HTTPSRequestsConnectionClass:
         timeout: Optional[int] = None,
         retry: Optional[Union[int, Retry]] = None,
         pool_size: Optional[int] = None,
+        shared: bool = False,
         **kwargs: Any,
     ) -> None:
         """
@@ -96,6 +188,7 @@ class HTTPSRequestsConnectionClass:
             timeout (Optional[int]): The request timeout in seconds.
             retry (Optional[Union[int, Retry]]): Retry configuration or number of retries.
             pool_size (Optional[int]): The maximum size of the connection pool.
+            shared (bool): Use the process-wide session of the configuration, see `shared_session`.
             **kwargs (Any): Additional arguments, such as SSL verification flags.
         """
         self.port = port if port else 443
@@ -103,9 +196,9 @@ class HTTPSRequestsConnectionClass:
         self.protocol = "https"
         self.timeout = timeout
         self.verify = kwargs.get("verify", True)
-        self.session = requests.Session()
+        self.shared = shared
 
-        self.session.auth = noopAuth
+        import requests.adapters
 
         if retry is None:
             self.retry = requests.adapters.DEFAULT_RETRIES
@@ -117,12 +210,10 @@ class HTTPSRequestsConnectionClass:
         else:
             self.pool_size = pool_size
 
-        self.adapter = requests.adapters.HTTPAdapter(
-            max_retries=self.retry,
-            pool_connections=self.pool_size,
-            pool_maxsize=self.pool_size,
-        )
-        self.session.mount("https://", self.adapter)
+        if shared:
+            self.session, self.adapter = shared_session(self.retry, self.pool_size)
+        else:
+            self.session, self.adapter = _new_session(self.retry, self.pool_size)
 
     def request(
         self,
@@ -164,8 +255,63 @@ class HTTPSRequestsConnectionClass:
         )
         return RequestsResponse(r)
 
+    def download(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        output: BinaryIO,
+        allowed_hosts: Collection[str],
+        max_redirects: int = 5,
+        chunk_size: int = 1 << 20,
+    ) -> Tuple[int, Dict[str, str]]:
+        """
+        Streams the body of a GET request into a file, following redirects.
+
+        Redirects are followed manually so that each target is checked against `allowed_hosts`,
+        and the `Authorization` header is not sent to other hosts (e.g. `codeload.github.com`,
+        whose redirect URLs carry their own token).
+
+        Args:
+            url (str): The URL path for the request.
+            headers (Dict[str, str]): The headers for the request.
+            output (BinaryIO): The file receiving the response body.
+            allowed_hosts (Collection[str]): Hosts redirects may lead to.
+            max_redirects (int): Maximum number of redirects to follow.
+            chunk_size (int): Size of the chunks written to `output`.
+
+        Returns:
+            Tuple[int, Dict[str, str]]: The status and the lower-cased headers of the final response.
+        """
+        target = f"{self.protocol}://{self.host}:{self.port}{url}"
+        for _ in range(max_redirects + 1):
+            r = self.session.get(
+                target,
+                headers=headers,
+                timeout=self.timeout,
+                verify=self.verify,
+                allow_redirects=False,
+                stream=True,
+            )
+            with r:
+                if r.is_redirect:
+                    target = urllib.parse.urljoin(target, r.headers["location"])
+                    o = urllib.parse.urlparse(target)
+                    assert o.scheme == self.protocol, target
+                    assert o.hostname in allowed_hosts, o.hostname
+                    if o.hostname != self.host:
+                        headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+                    continue
+                responseHeaders = {k.lower(): v for k, v in r.headers.items()}
+                if r.status_code >= 400:
+                    raise Exception(f'{r.status_code} {r.text}')
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    output.write(chunk)
+                return r.status_code, responseHeaders
+        raise Exception(f"Exceeded {max_redirects} redirects for {url}")
+
     def close(self) -> None:
         """
-        Closes the session and cleans up resources.
+        Closes the session and cleans up resources. Shared sessions stay open for other connections.
         """
-        self.session.close()
+        if not self.shared:
+            self.session.close()
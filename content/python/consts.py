@@ -7,12 +7,25 @@ Consts = {
     'DEFAULT_TIMEOUT': 15,
     'DEFAULT_USER_AGENT': 'Github API client by Github:@ibraym',
     'DEFAULT_PER_PAGE': 30,
+    'MAX_PER_PAGE': 100,
     'DEFAULT_SECONDS_BETWEEN_REQUESTS': 1,
     'DEFAULT_SECONDARY_RATE_WAIT': 60,
+    'SECONDARY_MAX_CONCURRENT_REQUESTS': 100,
+    'SECONDARY_POINTS_PER_MINUTE': 900,
+    'SECONDARY_POINTS_GET': 1,
+    'SECONDARY_POINTS_MUTATING': 5,
+    'DEFAULT_MAX_WORKERS': 8,
+    'DEFAULT_POOL_SIZE': 10,
+    'DEFAULT_JWT_EXPIRY': 540,
+    'DEFAULT_JWT_ISSUED_AT': -60,
+    'DEFAULT_TOKEN_REFRESH_MARGIN': 300,
+    'TOKEN_REFRESH_RETRY_MIN': 5,
+    'TOKEN_REFRESH_RETRY_MAX': 30,
     'headerRateRemaining': 'x-ratelimit-remaining',
     'headerRateLimit': 'x-ratelimit-limit',
     'headerRateReset': "X-RateLimit-Reset",
     'headerRawJSON': 'application/vnd.github.raw+json',
     'headerHtmlJSON': 'application/vnd.github.html+json',
     'headerObjectJSON': 'application/vnd.github.object+json',
+    'headerJSON': 'application/vnd.github+json',
 }
\ No newline at end of file
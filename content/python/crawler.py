@@ -0,0 +1,383 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+"""
+Sharded commit crawler.
+
+Usage::
+
+    python -m crawler --token $TOKEN_A --token $TOKEN_B --repo torvalds/linux --output out/
+    python -m crawler --query OpenAI --qualifier in=readme --max-repos 200 --processes 8 --output out/
+
+The repositories are split into shards, each shard runs in its own process with
+its own `Github` clients and subset of tokens, and writes its commits to its own
+newline-delimited JSON (or Parquet) file. The shard files are merged once all
+shards have finished.
+"""
+
+from typing import Optional, Any, Dict, Iterable, List, Iterator, Tuple
+import argparse
+import itertools
+import json
+import os
+import queue
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from auth import Token
+from cache import CommitCache
+from connection import close_shared_sessions
+from github_client import Github
+
+import logging
+logger = logging.getLogger('my_logger')
+
+FORMATS = ('jsonl', 'parquet')
+# rows per Parquet row group, bounds the memory a shard holds
+PARQUET_BATCH_SIZE = 1000
+
+
+def shard(values: List[Any], count: int) -> List[List[Any]]:
+    """
+    Split values into `count` round-robin shards.
+
+    :param values: The values to split.
+    :param count: The number of shards.
+    :return: A list of `count` lists, some of which may be empty.
+    """
+    assert count > 0, count
+    return [values[index::count] for index in range(count)]
+
+
+def shard_tokens(tokens: List[str], count: int) -> List[List[str]]:
+    """
+    Give each shard its own subset of tokens.
+
+    Tokens are split round-robin when there are at least as many tokens as shards,
+    otherwise shards share tokens.
+
+    :param tokens: The available tokens.
+    :param count: The number of shards.
+    :return: A list of token subsets, one per shard.
+    """
+    assert len(tokens) > 0, "need at least one token"
+    if len(tokens) >= count:
+        return shard(tokens, count)
+    return [[tokens[index % len(tokens)]] for index in range(count)]
+
+
+def shard_path(output: str, index: int, format: str) -> str:
+    """
+    :return: The path of the output file of the shard `index`.
+    """
+    return os.path.join(output, f"shard-{index:04d}.{format}")
+
+
+def crawl_shard(
+    index: int,
+    repositories: List[str],
+    tokens: List[str],
+    output: str,
+    format: str,
+    commit_parameters: Dict[str, Any],
+    client_parameters: Dict[str, Any],
+    progress: Optional[Any] = None,
+    cache_directory: Optional[str] = None,
+) -> Tuple[int, List[str], int, List[str]]:
+    """
+    Crawl the commits of a shard of repositories. Runs inside a worker process.
+
+    :param index: The shard index.
+    :param repositories: `owner/repo` names handled by this shard.
+    :param tokens: The tokens of this shard, repositories are spread over them.
+    :param output: The output directory.
+    :param format: One of `FORMATS`.
+    :param commit_parameters: Keyword arguments passed to `Github.commits`.
+    :param client_parameters: Keyword arguments passed to `Github`.
+    :param progress: Optional queue receiving `(shard, repository, commits, failed)` tuples.
+    :param cache_directory: Optional directory of the commit details cache, shared by all shards.
+    :return: Tuple containing the shard index, its output paths, the number of written commits and the
+        repositories that failed, whose commits written before the error are kept.
+    """
+    commit_cache = CommitCache(cache_directory)
+    clients = [Github(auth=Token(token), commit_cache=commit_cache, **client_parameters) for token in tokens]
+    path = shard_path(output, index, format)
+    paths = [path]
+    count = 0
+    failed: List[str] = []
+
+    def records() -> Iterator[Dict[str, Any]]:
+        nonlocal count
+        for position, repository in enumerate(repositories):
+            owner, repo = repository.split("/", 1)
+            client = clients[position % len(clients)]
+            repo_count = 0
+            error = False
+            try:
+                for commit in client.commits(owner=owner, repo=repo, **commit_parameters):
+                    repo_count += 1
+                    yield {**commit, "repository": repository}
+            except Exception as e:
+                logger.error(f"Shard {index}: failed to crawl {repository}: {e}")
+                failed.append(repository)
+                error = True
+            count += repo_count
+            if progress is not None:
+                progress.put((index, repository, repo_count, error))
+
+    try:
+        if format == 'jsonl':
+            with open(path, 'w', encoding='utf-8') as f:
+                for record in records():
+                    f.write(json.dumps(record))
+                    f.write("\n")
+        else:
+            paths = write_parquet(path, records())
+    finally:
+        for client in clients:
+            client.close()
+        close_shared_sessions()
+
+    return index, paths, count, failed
+
+
+def _table(records: List[Dict[str, Any]]) -> Any:
+    """
+    Convert records to a pyarrow table, inferring the schema from the keys of all records
+    (`Table.from_pylist` only looks at the first one), nested objects included.
+    """
+    import pyarrow
+
+    return pyarrow.Table.from_struct_array(pyarrow.array(records))
+
+
+def _conform(table: Any, schema: Any) -> Any:
+    """
+    Cast a table to a schema unified from its own, missing columns and nested fields are null.
+    """
+    import pyarrow
+
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field.name, pyarrow.nulls(table.num_rows, field.type))
+    return table.select(schema.names).cast(schema)
+
+
+def write_parquet(path: str, records: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Stream records to Parquet, `PARQUET_BATCH_SIZE` rows at a time. Requires the optional `pyarrow` dependency.
+
+    The schema is inferred from the first batch. A later batch whose own schema, nested
+    fields included, unifies into it (e.g. a key it lacks) is cast to it. Otherwise (e.g.
+    a new key, a new nested field, or a column that was always null) the file is closed
+    and the following rows go to a new part `{name}-{part}.parquet`, written with the
+    unified schema when there is one.
+
+    :param path: Path of the first part.
+    :param records: The records, consumed lazily.
+    :return: The paths of the written parts.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet output requires the `pyarrow` package") from e
+
+    root, extension = os.path.splitext(path)
+    paths: List[str] = []
+    writer: Optional[Any] = None
+    records = iter(records)
+    try:
+        while batch := list(itertools.islice(records, PARQUET_BATCH_SIZE)):
+            table = _table(batch)
+            if writer is not None:
+                try:
+                    schema = pyarrow.unify_schemas([writer.schema, table.schema], promote_options="permissive")
+                    table = _conform(table, schema)
+                except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError):
+                    schema = table.schema
+                if not schema.equals(writer.schema):
+                    writer.close()
+                    writer = None
+            if writer is None:
+                part = path if not paths else f"{root}-{len(paths)}{extension}"
+                writer = pyarrow.parquet.ParquetWriter(part, table.schema)
+                paths.append(part)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not paths:
+        pyarrow.parquet.write_table(pyarrow.table({}), path)
+        paths.append(path)
+    return paths
+
+
+def merge(paths: List[str], output: str, format: str) -> str:
+    """
+    Merge shard files into a single output file.
+
+    Parquet parts are streamed one row group at a time into a file with their unified schema.
+
+    :param paths: Shard file paths, merged in the given order.
+    :param output: The output directory.
+    :param format: One of `FORMATS`.
+    :return: The path of the merged file.
+    """
+    path = os.path.join(output, f"commits.{format}")
+    if format == 'jsonl':
+        with open(path, 'wb') as merged:
+            for shard_file in paths:
+                with open(shard_file, 'rb') as f:
+                    while chunk := f.read(1 << 20):
+                        merged.write(chunk)
+    else:
+        import pyarrow
+        import pyarrow.parquet
+
+        # stream row group by row group, only the schemas of all parts are read upfront
+        files = [pyarrow.parquet.ParquetFile(shard_file) for shard_file in paths]
+        try:
+            parts = [f for f in files if f.metadata.num_rows > 0]
+            schema = pyarrow.unify_schemas([f.schema_arrow for f in parts], promote_options="permissive") \
+                if parts else pyarrow.schema([])
+            with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+                for f in parts:
+                    for group in range(f.num_row_groups):
+                        writer.write_table(_conform(f.read_row_group(group), schema))
+        finally:
+            for f in files:
+                f.close()
+    return path
+
+
+def resolve_repositories(args: argparse.Namespace, tokens: List[str]) -> List[str]:
+    """
+    Collect the `owner/repo` names to crawl from the command line arguments.
+    """
+    repositories: List[str] = list(args.repo or [])
+    if args.repos is not None:
+        with open(args.repos, encoding='utf-8') as f:
+            repositories.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if args.query is not None or args.qualifier:
+        qualifiers = dict(qualifier.split("=", 1) for qualifier in args.qualifier or [])
+        client = Github(auth=Token(tokens[0]))
+        try:
+            found = 0
+            for repository in client.search_repositories(args.query or "", qualifiers=qualifiers):
+                repositories.append(repository["full_name"])
+                found += 1
+                if args.max_repos is not None and found >= args.max_repos:
+                    break
+        finally:
+            client.close()
+
+    # drop duplicates but keep order
+    repositories = list(dict.fromkeys(repositories))
+    for repository in repositories:
+        assert repository.count("/") == 1, repository
+    return repositories
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="crawler", description="Crawl commits of many repositories in parallel.")
+    source = parser.add_argument_group("repositories")
+    source.add_argument("--repo", action="append", help="owner/repo to crawl, may be repeated")
+    source.add_argument("--repos", help="file with one owner/repo per line")
+    source.add_argument("--query", help="search query used to find repositories")
+    source.add_argument("--qualifier", action="append", help="search qualifier as key=value, may be repeated")
+    source.add_argument("--max-repos", type=int, help="maximum number of repositories taken from the search")
+
+    commits = parser.add_argument_group("commits")
+    commits.add_argument("--sha", help="branch or commit SHA to start listing commits from")
+    commits.add_argument("--since", help="ISO 8601 date, only commits after it")
+    commits.add_argument("--until", help="ISO 8601 date, only commits before it")
+    commits.add_argument("--details", action="store_true", help="fetch the files and stats of each commit")
+    commits.add_argument("--cache-dir", help="directory caching commit details across runs and shards")
+
+    parser.add_argument("--token", action="append", help="GitHub token, may be repeated (defaults to $GITHUB_TOKENS)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--per-page", type=int, default=100, help="items per page")
+    parser.add_argument("--format", choices=FORMATS, default='jsonl', help="output file format")
+    parser.add_argument("--output", required=True, help="output directory")
+    parser.add_argument("--no-merge", action="store_true", help="keep the shard files only")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(format="%(asctime)s %(message)s")
+    logger.setLevel(logging.INFO)
+
+    args = parse_args(argv)
+    tokens = args.token or [t for t in os.environ.get("GITHUB_TOKENS", "").split(",") if t]
+    if not tokens:
+        logger.error("No token given, use --token or $GITHUB_TOKENS")
+        return 2
+
+    repositories = resolve_repositories(args, tokens)
+    if not repositories:
+        logger.error("No repositories to crawl")
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    processes = max(1, min(args.processes, len(repositories)))
+    commit_parameters = {k: getattr(args, k) for k in ("sha", "since", "until") if getattr(args, k) is not None}
+    if args.details:
+        commit_parameters["with_details"] = True
+    client_parameters = {"per_page": args.per_page}
+    logger.info(f"Crawling {len(repositories)} repositories with {processes} processes")
+
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=processes) as executor:
+        progress = manager.Queue()
+        pending: List[Future] = [
+            executor.submit(
+                crawl_shard,
+                index,
+                repositories_shard,
+                tokens_shard,
+                args.output,
+                args.format,
+                commit_parameters,
+                client_parameters,
+                progress,
+                args.cache_dir,
+            )
+            for index, (repositories_shard, tokens_shard) in enumerate(
+                zip(shard(repositories, processes), shard_tokens(tokens, processes))
+            )
+        ]
+        results: List[Tuple[int, List[str], int, List[str]]] = []
+        done_repositories = 0
+        total_commits = 0
+        while pending:
+            finished, still_pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            pending = list(still_pending)
+            while True:
+                try:
+                    index, repository, count, error = progress.get_nowait()
+                except queue.Empty:
+                    break
+                done_repositories += 1
+                total_commits += count
+                logger.info(
+                    f"[{done_repositories}/{len(repositories)}] shard {index}: {repository} "
+                    f"{count} commits{' (failed)' if error else ''} ({total_commits} total)"
+                )
+            for future in finished:
+                results.append(future.result())
+
+    paths = [path for _, shard_paths, _, _ in sorted(results) for path in shard_paths]
+    if not args.no_merge:
+        path = merge(paths, args.output, args.format)
+        logger.info(f"Merged {len(paths)} shards into {path}")
+
+    failed = [repository for _, _, _, shard_failed in sorted(results) for repository in shard_failed]
+    if failed:
+        logger.error(f"Failed to crawl {len(failed)} of {len(repositories)} repositories: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
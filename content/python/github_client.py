@@ -1,4 +1,60 @@
-default_retry = GithubRetry()
+# Copyright: 2024 Ibrahem Mouhamad
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Any, Dict, Union, Iterable, Iterator, List, Tuple
+import urllib.parse
+import contextlib
+import contextvars
+import itertools
+import os
+import threading
+
+from auth import Auth, AppInstallationAuth
+from cache import CommitCache
+from comparison import Comparison
+from connection import HTTPSRequestsConnectionClass
+from consts import Consts
+from governor import SecondaryRateGovernor
+from page import Page
+from scheduler import RequestScheduler, Scheduling, scheduling
+from utils import add_parameters_to_url, is_iso_format, pageNumber, UrlTemplate
+
+# heavy dependencies (requests, urllib3, tarfile, ...) are imported on first use
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib3.util import Retry
+    from snapshot import Snapshot
+
+import logging
+logger = logging.getLogger('my_logger')
+
+# marks the default retry, a shared `GithubRetry` created when the first connection is made
+DEFAULT_RETRY: Any = object()
+_default_retry: Optional[Retry] = None
+_default_retry_lock = threading.Lock()
+
+def get_default_retry() -> Retry:
+    """
+    :return: The `GithubRetry` used by clients created without an explicit `retry`.
+    """
+    global _default_retry
+    with _default_retry_lock:
+        if _default_retry is None:
+            from github_retry import GithubRetry
+            _default_retry = GithubRetry()
+        return _default_retry
+
+def _is_retry(value: Any) -> bool:
+    # only reached for values that are not None or an int, a Retry object means urllib3 is already imported
+    from urllib3.util import Retry
+    return isinstance(value, Retry)
+
+def __getattr__(name: str) -> Any:
+    # `default_retry` used to be created at import time
+    if name == "default_retry":
+        return get_default_retry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Github:
     """
@@ -14,8 +70,14 @@ class Github:
         user_agent: str = Consts['DEFAULT_USER_AGENT'],
         per_page: int = Consts['DEFAULT_PER_PAGE'],
         verify: bool | str = True,
-        retry: int | Retry | None = default_retry,
+        retry: int | Retry | None = DEFAULT_RETRY,
         seconds_between_requests: float | None = Consts['DEFAULT_SECONDS_BETWEEN_REQUESTS'],
+        max_workers: int = Consts['DEFAULT_MAX_WORKERS'],
+        pool_size: Optional[int] = None,
+        commit_cache: Optional[CommitCache] = None,
+        governor: Optional[SecondaryRateGovernor] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        shared_session: bool = True,
     )-> None:
         """
         Initialize the GitHub API client.
@@ -26,16 +88,30 @@ class Github:
         :param user_agent: User agent string for the client.
         :param per_page: Number of items per page for paginated responses.
         :param verify: SSL verification (can be `True`, `False`, or a path to a CA_BUNDLE file).
-        :param retry: Retry configuration, either an integer or a `Retry` object.
-        :param seconds_between_requests: Minimum delay between requests to avoid rate-limiting.
+        :param retry: Retry configuration, either an integer or a `Retry` object (defaults to a shared `GithubRetry`).
+        :param seconds_between_requests: Minimum delay between the start of consecutive requests to avoid rate-limiting.
+        :param max_workers: Number of threads used for concurrent fetches (e.g. commit details).
+        :param pool_size: Maximum number of kept-alive connections to the API host (defaults to enough for `max_workers`
+                          threads and the calling thread, at least `Consts['DEFAULT_POOL_SIZE']`).
+        :param commit_cache: Cache of commit details, can be shared between clients (defaults to an in-memory cache).
+        :param governor: Secondary rate limit budgets, can be shared between clients using the same token (defaults to GitHub's documented limits).
+        :param scheduler: Request scheduler, can be shared between clients sharing a rate budget (defaults to one spacing requests by `seconds_between_requests`).
+        :param shared_session: Reuse the process-wide session and connection pool of the retry and pool configuration instead of
+                               creating one per client. The shared session keeps no cookies, and its sockets are only released
+                               by `connection.close_shared_sessions()`, not by `close()`.
         """
         assert isinstance(auth, Auth), auth
         assert isinstance(timeout, int), timeout
         assert user_agent is None or isinstance(user_agent, str), user_agent
         assert isinstance(per_page, int), per_page
         assert isinstance(verify, (bool, str)), verify
-        assert retry is None or isinstance(retry, int) or isinstance(retry, urllib3.util.Retry), retry
+        assert retry is None or retry is DEFAULT_RETRY or isinstance(retry, int) or _is_retry(retry), retry
         assert seconds_between_requests is None or seconds_between_requests >= 0
+        assert isinstance(max_workers, int) and max_workers > 0, max_workers
+        assert pool_size is None or (isinstance(pool_size, int) and pool_size > 0), pool_size
+        assert commit_cache is None or isinstance(commit_cache, CommitCache), commit_cache
+        assert governor is None or isinstance(governor, SecondaryRateGovernor), governor
+        assert scheduler is None or isinstance(scheduler, RequestScheduler), scheduler
 
         self.__auth = auth
         self.__base_url = base_url
@@ -45,11 +121,24 @@ class Github:
         self.__hostname = o.hostname
         self.__port = o.port
         self.__prefix = o.path
+        # absolute URLs starting with `{origin}{prefix}/` need no further validation
+        self.__origin = f"https://{o.hostname}" + (f":{o.port}" if o.port else "")
+        self.__absolute_prefix = f"{self.__origin}{o.path}/"
 
         self.__timeout = timeout
         self.__retry = retry
-        self.__seconds_between_requests = seconds_between_requests
-        self.__connection = None
+        self.__shared_session = shared_session
+        self.__scheduler = scheduler if scheduler is not None else RequestScheduler(seconds_between_requests)
+        # each thread uses its own connection, all of them are closed by `close`
+        self.__local = threading.local()
+        self.__connections: List[HTTPSRequestsConnectionClass] = []
+        self.__lock = threading.Lock()
+        self.__max_workers = max_workers
+        self.__pool_size = pool_size if pool_size is not None else max(max_workers + 1, Consts['DEFAULT_POOL_SIZE'])
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__commit_cache = commit_cache if commit_cache is not None else CommitCache()
+        self.__governor = governor if governor is not None else SecondaryRateGovernor()
+        self.__snapshots: Dict[Tuple[str, str, Optional[str]], Snapshot] = dict()
 
         self.rate_limiting = (-1, -1)
         self.rate_limiting_resettime = 0
@@ -58,37 +147,85 @@ class Github:
         assert user_agent is not None # github now requires a user-agent.
         self.__userAgent = user_agent
         self.__verify = verify
-        self.__last_requests: Dict[str, float] = dict()
 
     def __getConnection(self):
         """
-        Create and configure the HTTP connection object if it does not already exist.
+        Create and configure the HTTP connection object of the current thread if it does not already exist.
 
         :return: Configured HTTPS connection object.
         """
-        if self.__connection is not None:
-            return self.__connection
+        connection = getattr(self.__local, 'connection', None)
+        if connection is not None:
+            return connection
 
-        return HTTPSRequestsConnectionClass(
+        connection = HTTPSRequestsConnectionClass(
             self.__hostname,
             self.__port,
-            retry=self.__retry,
+            retry=get_default_retry() if self.__retry is DEFAULT_RETRY else self.__retry,
             timeout=self.__timeout,
             verify=self.__verify,
+            pool_size=self.__pool_size,
+            shared=self.__shared_session,
         )
+        self.__local.connection = connection
+        with self.__lock:
+            self.__connections.append(connection)
+        return connection
 
-    def __deferRequest(self) -> None:
+    @contextlib.contextmanager
+    def __deferRequest(self, method: str, url: str) -> Iterator[None]:
         """
         Enforce a delay between consecutive requests to respect the API's rate limits.
+
+        The request waits for a slot of the scheduler, which serves higher priorities first
+        and shares the slots fairly between the jobs of the same priority, see `scheduling`.
+        Holding the slot, it waits for the concurrency budget of the governor, so the requests
+        also pass the governor in the order of the scheduler. A request whose endpoint family is
+        out of points is parked until the family's budget frees up, requests of other families
+        go ahead meanwhile.
+
+        :param method: HTTP method of the request.
+        :param url: The request path, including the API prefix.
+        """
+        path = url[len(self.__prefix):]
+        self.__scheduler.acquire(admit=lambda: self.__governor.try_acquire(method, path))
+        try:
+            yield
+        finally:
+            self.__governor.release()
+
+    def scheduling(
+        self,
+        priority: str = 'default',
+        tag: str = 'default',
+        weight: float = 1.0,
+    ) -> contextlib.AbstractContextManager[Scheduling]:
         """
-        requests = self.__last_requests.values()
+        Schedule the requests made in this context with the given priority and job.
+
+        :param priority: One of `'interactive'`, `'default'` or `'bulk'`; waiting requests of a higher priority are sent first.
+        :param tag: The job the requests belong to; jobs of the same priority share the request slots fairly.
+        :param weight: The share of the job relative to the other jobs of the same priority.
+        :return: A context manager.
 
-        last_request = max(requests) if requests else 0
+        **Example Usage:**
 
-        next_request = (last_request + self.__seconds_between_requests) if self.__seconds_between_requests else 0
+        ```python
+        # in the backfill job
+        with github.scheduling(priority='bulk', tag='backfill'):
+            for commit in github.commits("torvalds", "linux"):
+                ...
+
+        # in the request handler, jumps ahead of the backfill pages
+        with github.scheduling(priority='interactive', tag='lookup'):
+            readme = next(github.contents("torvalds", "linux", "README", content_type='raw'))
+        ```
 
-        defer = max(next_request - datetime.now(timezone.utc).timestamp(), 0)
-        time.sleep(defer)
+        **Notes:**
+        - The scheduling applies to generators while they are consumed inside the context.
+        - Concurrent fetches started in the context (e.g. `commit_details`) inherit it.
+        """
+        return scheduling(priority, tag, weight)
 
     def __send_request(
         self,
@@ -106,21 +243,55 @@ class Github:
         :param input: Optional payload or body for the request.
         :return: Tuple containing status, response headers, and response content.
         """
-        self.__deferRequest()
+        connection = self.__getConnection()
 
-        try:
-            self.__connection = self.__getConnection()
-
-            self.__connection.request(method, url, input, headers)
-            response = self.__connection.getresponse()
+        with self.__deferRequest(method, url):
+            connection.request(method, url, input, headers)
+            response = connection.getresponse()
 
             status = response.status
             responseHeaders = {k.lower(): v for k, v in response.getheaders()}
             output = response.read()
 
-            return status, responseHeaders, output
-        finally:
-            self.__last_requests[method] = datetime.now(timezone.utc).timestamp()
+        return status, responseHeaders, output
+
+    def __download(
+        self,
+        url: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Perform a GET request and stream its (gzip decompressed) body to a file, following redirects
+        to the API host and `codeload.github.com`.
+
+        :param url: Target URL for the request.
+        :param path: Path of the file receiving the body.
+        :param headers: Optional HTTP headers for the request.
+        :return: The response headers.
+        """
+        if headers is None:
+            headers = {}
+        if self.__auth is not None:
+            self.__auth.select(url).authentication(headers)
+        headers['User-Agent'] = self.__userAgent
+
+        url = self.__makeAbsoluteUrl(url)
+
+        connection = self.__getConnection()
+
+        from snapshot import GunzipWriter
+
+        with self.__deferRequest('get', url), open(path, 'wb') as f:
+            writer = GunzipWriter(f)
+            status, responseHeaders = connection.download(
+                url,
+                headers,
+                writer,
+                allowed_hosts=(self.__hostname, "codeload.github.com"),
+            )
+            writer.flush()
+        return responseHeaders
 
     def __makeAbsoluteUrl(self, url: str) -> str:
         """
@@ -131,6 +302,8 @@ class Github:
         """
         if url.startswith("/"):
             url = f"{self.__prefix}{url}"
+        elif url.startswith(self.__absolute_prefix):
+            url = url[len(self.__origin):]
         else:
             o = urllib.parse.urlparse(url)
             assert o.hostname in [
@@ -146,59 +319,42 @@ class Github:
                 url += f"?{o.query}"
         return url
 
-    def __check_response(
-        self,
-        status: int,
-        responseHeaders: Dict[str, Any],
-        output: str,
-    ) -> Tuple[Dict[str, Any], Any]:
+    @staticmethod
+    def __check_status(status: int, output: Union[str, bytes]) -> None:
         """
-        Check the API response for errors and decode the response content.
+        Raise an exception for HTTP error responses.
 
         :param status: HTTP status code.
-        :param responseHeaders: Dictionary of HTTP response headers.
         :param output: Raw response content.
-        :return: Decoded response data (JSON if applicable).
         """
-        data = output
-        is_JSON = False
-        if isinstance(output, bytes):
-            data = output.decode('utf-8')
         if status >= 400:
-            raise Exception(f'{status} {data}')
-        if 'content-type' in responseHeaders:
-            if Consts['headerRawJSON'] in responseHeaders['content-type'] or \
-               Consts['headerHtmlJSON'] in responseHeaders['content-type']:
-                return responseHeaders, data
-        if len(data) == 0:
-            return None
-        else:
-            try:
-                data = json.loads(data)
-            except ValueError:
-                raise
-        return responseHeaders, data
-
+            if isinstance(output, bytes):
+                output = output.decode('utf-8')
+            raise Exception(f'{status} {output}')
 
-    def __get(self,
+    def __get_raw(self,
         url: str,
         parameters: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-    ) -> Tuple[Dict[str, Any], Any]:
+        auth: Optional[Auth] = None,
+    ) -> Tuple[int, Dict[str, Any], str]:
         """
-        Perform a GET request to the GitHub API.
+        Perform a GET request to the GitHub API without checking or decoding the response.
 
         :param url: Target URL for the request.
         :param parameters: Optional query parameters for the request.
         :param headers: Optional HTTP headers for the request.
-        :return: Tuple containing response headers and data.
+        :param auth: Optional authentication selected for the request, defaults to `self.__auth.select(url)`.
+        :return: Tuple containing status, response headers and undecoded content.
         """
         if parameters is None:
             parameters = {}
         if headers is None:
             headers = {}
-        if self.__auth is not None:
-            self.__auth.authentication(headers)
+        if auth is None and self.__auth is not None:
+            auth = self.__auth.select(url)
+        if auth is not None:
+            auth.authentication(headers)
         headers['User-Agent'] = self.__userAgent
 
         url = self.__makeAbsoluteUrl(url)
@@ -211,10 +367,58 @@ class Github:
                 int(float(responseHeaders[Consts['headerRateRemaining']])),
                 int(float(responseHeaders[Consts['headerRateLimit']])),
             )
-        if Consts['headerRateReset'] in responseHeaders:
-            self.rate_limiting_resettime = int(float(responseHeaders[Consts['headerRateReset']]))
+            if isinstance(auth, AppInstallationAuth):
+                auth.rate_limiting = self.rate_limiting
+        if Consts['headerRateReset'].lower() in responseHeaders:
+            self.rate_limiting_resettime = int(float(responseHeaders[Consts['headerRateReset'].lower()]))
+
+        return status, responseHeaders, output
+
+    def pages(self,
+            url: str,
+            params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, Union[str, int]]] = None) -> Iterator[Page]:
+        """
+        Create a generator to iterate lazily over the pages of a paginated response.
 
-        return self.__check_response(status, responseHeaders, output)
+        Each page is fetched when the generator is advanced and its body is only decoded
+        when its items are accessed, so callers can size the work from the first page
+        (`total_count`, `last_page`), stop early, or skip pages based on their metadata.
+
+        :param url: API endpoint URL, a path relative to the API or an absolute URL, may include a query string.
+        :param params: Query parameters for the request, they take precedence over the ones in `url`.
+        :param headers: HTTP headers for the request.
+        :return: Iterator yielding `Page` objects.
+
+        **Example Usage:**
+
+        ```python
+        for page in github.pages("/search/repositories", {"q": "OpenAI"}):
+            print(page.number, page.last_page, page.total_count, page.rate_limit)
+            for repo in page.items:
+                print(repo["full_name"])
+        ```
+        """
+        params = dict(params) if params else {}
+        if self.per_page != 30:
+            params.setdefault('per_page', self.per_page)
+        # the first URL is encoded once, later ones come ready-made from the `Link` header
+        nextUrl: Optional[str]
+        if url.startswith("/") and "?" not in url and "#" not in url:
+            nextUrl = UrlTemplate(url, params).url
+        else:
+            # absolute URLs (e.g. a `next` link) or URLs with a query are merged with the parameters
+            nextUrl = add_parameters_to_url(url, params)
+        number = pageNumber(nextUrl) or 1
+        # all pages are requested with the same token, they share its access and rate limit
+        auth = self.__auth.select(url) if self.__auth is not None else None
+        while nextUrl is not None:
+            status, responseHeaders, output = self.__get_raw(nextUrl, headers=dict(headers) if headers else None, auth=auth)
+            self.__check_status(status, output)
+            page = Page(number, responseHeaders, output)
+            yield page
+            nextUrl = page.next_url
+            number += 1
 
     def paginator(self,
             url: str,
@@ -228,40 +432,38 @@ class Github:
         :param headers: HTTP headers for the request.
         :return: Iterator yielding items from all pages.
         """
-        nextParams: Dict[str, Any] = params or {}
-        nextUrl = url
-        if self.per_page != 30:
-            nextParams['per_page'] = self.per_page
-        while nextUrl is not None:
-            headers, data = self.__get(nextUrl, nextParams, headers)
-            if 'content-type' in headers:
-                if Consts['headerRawJSON'] in headers['content-type'] or \
-                    Consts['headerHtmlJSON'] in headers['content-type']:
-                    content = data
-                    yield content
-            data = data if data else []
-            nextUrl = None
-            if len(data) > 0:
-                links = parseLinkHeader(headers)
-                if "next" in links:
-                    nextUrl = links["next"]
-            nextParams = {}
-            if 'items' in data:
-                totalCount = data.get('total_count')
-                data = data['items']
-            content = [
-                element
-                for element in data
-                if element is not None
-            ]
-            yield from content
-
+        for page in self.pages(url, params, headers):
+            yield from page.items
 
     def close(self) -> None:
         """
-        Close the API client's connection to the server.
+        Close the API client's connections to the server.
+
+        With `shared_session` (the default) the process-wide session stays open for other clients,
+        call `connection.close_shared_sessions()` to release its sockets.
+        """
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+            connections, self.__connections = self.__connections, []
+            snapshots, self.__snapshots = self.__snapshots, dict()
+        if executor is not None:
+            executor.shutdown()
+        for connection in connections:
+            connection.close()
+        for snapshot in snapshots.values():
+            snapshot.close()
+        self.__local = threading.local()
+
+    def __getExecutor(self) -> ThreadPoolExecutor:
+        """
+        Create the thread pool used for concurrent fetches if it does not already exist.
         """
-        self.__connection.close()
+        with self.__lock:
+            if self.__executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="github")
+            return self.__executor
 
     def search_repositories(
         self,
@@ -311,6 +513,7 @@ class Github:
         committer: Optional[str] = None,
         since: Optional[str] = None,
         until: Optional[str] = None,
+        with_details: bool = False,
     ) -> Iterator[Dict]:
         """
         Retrieve a list of commits for a repository.
@@ -323,6 +526,7 @@ class Github:
         :param committer: Optional. Filter commits by a specific committer, using their GitHub username or email address.
         :param since: Optional. ISO 8601 date string to filter commits after the specified date.
         :param until: Optional. ISO 8601 date string to filter commits before the specified date.
+        :param with_details: Optional. Enrich each commit with its `files` and `stats`, see `commit_details`.
         :return: An iterator over dictionaries, where each dictionary represents a commit object.
 
         **Example Usage:**
@@ -370,11 +574,118 @@ class Github:
         if until is not None:
             assert isinstance(until, str) and is_iso_format(until), until
             url_parameters["until"] = until
-        return self.paginator(
+        commits = self.paginator(
             f"/repos/{owner}/{repo}/commits",
             url_parameters,
         )
+        if with_details:
+            return self.commit_details(owner, repo, (commit["sha"] for commit in commits))
+        return commits
+
+    def commit_details(
+        self,
+        owner: str,
+        repo: str,
+        shas: Iterable[str],
+    ) -> Iterator[Dict]:
+        """
+        Retrieve the details of commits, including their `files` and `stats`.
+
+        :calls: `GET /repos/{owner}/{repo}/commits/{ref} <https://docs.github.com/en/rest/commits/commits#get-a-commit>`
+        :param owner: The GitHub username or organization that owns the repository.
+        :param repo: The name of the repository.
+        :param shas: The commit SHAs (full or abbreviated) or refs, consumed lazily.
+        :return: An iterator over the commit details, in the order of `shas`.
+
+        **Notes:**
+        - SHAs are fetched concurrently in batches on `max_workers` threads, the requests still share
+          the client's delay between requests.
+        - Duplicate SHAs are fetched and yielded once.
+        - Commit details are immutable: they are kept in the client's `CommitCache` and never fetched
+          again, also when the same commit is reached through another branch or fork. Full SHAs hit the
+          cache across repositories, abbreviated SHAs only within the same repository, branch and tag
+          names are always fetched (their commit is cached under its full SHA).
+        - Every yielded commit is a copy, modifying it does not change the cache.
+        """
+        assert isinstance(owner, str), owner
+        assert isinstance(repo, str), repo
+        seen = set()
+        unique = (sha for sha in shas if not (sha in seen or seen.add(sha)))
+        batch_size = self.__max_workers * 4
+
+        while batch := list(itertools.islice(unique, batch_size)):
+            commits = {sha: self.__commit_cache.get(CommitCache.key(owner, repo, sha)) for sha in batch}
+            missing = [sha for sha, commit in commits.items() if commit is None]
+            if missing:
+                # run the fetches in the caller's context so they inherit its scheduling
+                context = contextvars.copy_context()
+                fetched = self.__getExecutor().map(
+                    lambda sha: context.copy().run(self.__commit_details, owner, repo, sha),
+                    missing,
+                )
+                commits.update(zip(missing, fetched))
+            for sha in batch:
+                yield commits[sha]
+
+    def __commit_details(self, owner: str, repo: str, sha: str) -> Dict:
+        """
+        Fetch the details of a single commit and add them to the cache.
+
+        Commits with many files have their `files` paginated, the pages are merged into one commit.
+        """
+        commit: Optional[Dict] = None
+        for page in self.pages(f"/repos/{owner}/{repo}/commits/{sha}"):
+            if commit is None:
+                commit = page.data
+            else:
+                commit.setdefault("files", []).extend(page.data.get("files", []))
+        # a branch or tag can look like an abbreviated SHA (e.g. `1234`), it is only an alias of the commit it names
+        alias = CommitCache.key(owner, repo, sha) if commit["sha"].startswith(sha.lower()) else None
+        self.__commit_cache.put(commit, alias=alias)
+        return commit
       
+    def compare(
+        self,
+        owner: str,
+        repo: str,
+        base: str,
+        head: str,
+    ) -> Comparison:
+        """
+        Compare two commits, e.g. two releases, in a few requests instead of walking the history.
+
+        :calls: `GET /repos/{owner}/{repo}/compare/{base}...{head} <https://docs.github.com/en/rest/commits/commits#compare-two-commits>`
+        :param owner: The GitHub username or organization that owns the repository.
+        :param repo: The name of the repository.
+        :param base: The base branch, tag or commit SHA.
+        :param head: The head branch, tag or commit SHA, may be prefixed with `user:` for cross-fork comparisons.
+        :return: A `Comparison` holding the status, counts and changed files, iterating it streams the commits.
+
+        **Example Usage:**
+
+        ```python
+        comparison = github.compare("octocat", "Hello-World", "v1.0", "v2.0")
+        print(comparison.total_commits, len(comparison.files))
+        for commit in comparison:
+            print(commit["sha"])
+        ```
+
+        **Notes:**
+        - Without pagination the API returns at most 250 commits, so the comparison is always
+          requested page by page (100 commits per page) to get the complete range.
+        - The changed files are only returned with the first page, they cover the entire range.
+        - The API lists at most 300 changed files, `Comparison.files` is incomplete for larger ranges.
+          Use `commit_details` on the streamed commits to get every changed file.
+        """
+        assert isinstance(owner, str), owner
+        assert isinstance(repo, str), repo
+        assert isinstance(base, str) and base, base
+        assert isinstance(head, str) and head, head
+        return Comparison(self.pages(
+            f"/repos/{owner}/{repo}/compare/{base}...{head}",
+            {"per_page": Consts['MAX_PER_PAGE']},
+        ))
+
     def contents(
         self,
         owner: str,
@@ -402,6 +713,8 @@ class Github:
         - If `ref` is not provided, the method retrieves content from the repository's default branch.
         - Use `content_type` to control how the content is returned (raw bytes, HTML, or JSON object).
         - This method supports paginated responses for directories containing multiple items.
+        - If a `snapshot` of the repository at `ref` was taken, the content is read from it without any request
+          (except for `'html'`). Items read from a snapshot have no `url`/`_links`, directories list no `sha`.
 
         **Headers:**
         - If `content_type` is specified, custom `Accept` headers are added to define the desired response format.
@@ -419,6 +732,10 @@ class Github:
         headers: Optional[Dict[str, str]] = None
         if content_type is not None:
             assert content_type in ['raw', 'html', 'object'], content_type
+        snapshot = self.__snapshots.get((owner, repo, ref))
+        if snapshot is not None and content_type != 'html':
+            return snapshot.contents(path, content_type)
+        if content_type is not None:
             if content_type == 'raw':
                 headers = {'Accept': Consts['headerRawJSON']}
             if content_type == 'html':
@@ -430,4 +747,75 @@ class Github:
             f"/repos/{owner}/{repo}/contents/{path}",
             url_parameters,
             headers=headers,
-        )
\ No newline at end of file
+        )
+
+    def snapshot(
+        self,
+        owner: str,
+        repo: str,
+        ref: Optional[str] = None,
+        directory: Optional[str] = None,
+    ) -> Snapshot:
+        """
+        Download the archive of a repository at a ref once, and serve `contents` calls for that ref from it.
+
+        :calls: `GET /repos/{owner}/{repo}/tarball/{ref} <https://docs.github.com/en/rest/repos/contents#download-a-repository-archive-tar>`
+        :param owner: The GitHub username or organization that owns the repository.
+        :param repo: The name of the repository.
+        :param ref: Optional. The name of the commit/branch/tag. Defaults to the repository's default branch,
+                    later `contents` calls must use the same `ref` to be served from the snapshot.
+        :param directory: Optional. Directory the archive is stored in (defaults to a new temporary directory).
+        :return: The indexed `Snapshot`.
+
+        **Example Usage:**
+
+        ```python
+        github.snapshot("octocat", "Hello-World", ref="main")
+        # no request is made from here on
+        for content in github.contents("octocat", "Hello-World", "README", ref="main", content_type="raw"):
+            print(content)
+        ```
+
+        **Notes:**
+        - The archive is streamed to disk and stored uncompressed; it is indexed, not extracted.
+        - Snapshotting a branch pins its content: later pushes are not seen until a new snapshot is taken.
+        - A new snapshot of the same ref replaces the previous one, which is closed. A temporary directory
+          created for a snapshot is removed when it is closed, e.g. by `close()`, after which `contents` calls
+          are requested again.
+        """
+        assert isinstance(owner, str), owner
+        assert isinstance(repo, str), repo
+        assert ref is None or isinstance(ref, str), ref
+        import shutil
+        import tempfile
+        from snapshot import Snapshot
+
+        temporary_directory = None
+        if directory is None:
+            directory = temporary_directory = tempfile.mkdtemp(prefix="github-snapshot-")
+        os.makedirs(directory, exist_ok=True)
+        name = "-".join([owner, repo] + ([ref] if ref else [])).replace("/", "_")
+        path = os.path.join(directory, f"{name}.tar")
+
+        # the previous snapshot may still read the archive at `path`, it is only replaced once the new one is indexed
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        snapshot = None
+        try:
+            self.__download(f"/repos/{owner}/{repo}/tarball" + (f"/{ref}" if ref else ""), temporary)
+            snapshot = Snapshot(temporary, temporary_directory)
+            os.replace(temporary, path)
+            snapshot.path = path
+        except BaseException:
+            if snapshot is not None:
+                snapshot.close()
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            if temporary_directory is not None:
+                shutil.rmtree(temporary_directory, ignore_errors=True)
+            raise
+
+        previous = self.__snapshots.get((owner, repo, ref))
+        self.__snapshots[(owner, repo, ref)] = snapshot
+        if previous is not None:
+            previous.close()
+        return snapshot
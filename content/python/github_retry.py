@@ -1,27 +1,29 @@
 # Copyright: 2024 Ibrahem Mouhamad
 
-from typing import Optional, Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Any
 from types import TracebackType
-from typing_extensions import Self
 import json
-from requests import Response
-from requests.utils import get_encoding_from_headers
-from requests.models import CaseInsensitiveDict
 from urllib3.util import Retry
-from urllib3.connectionpool import ConnectionPool
 from urllib3.exceptions import MaxRetryError
-from urllib3.response import HTTPResponse
-from datetime import timezone
+from datetime import datetime, timezone
 
 from consts import Consts
 
+if TYPE_CHECKING:
+    from typing_extensions import Self
+    from urllib3.connectionpool import ConnectionPool
+    from urllib3.response import HTTPResponse
+
 import logging
 logger = logging.getLogger('my_logger')
 
-logging.basicConfig()
 
 class GithubRetry(Retry):
 
+    __datetime = datetime
+
     def __init__(self, secondary_rate_wait: float = Consts['DEFAULT_SECONDARY_RATE_WAIT'], **kwargs: Any) -> None:
         """
         :param secondary_rate_wait: seconds to wait before retrying secondary rate limit errors
@@ -142,6 +144,10 @@ class GithubRetry(Retry):
 
     @staticmethod
     def get_content(resp: HTTPResponse, url: str) -> bytes:
+        from requests import Response
+        from requests.utils import get_encoding_from_headers
+        from requests.models import CaseInsensitiveDict
+
         # logic taken from HTTPAdapter.build_response (requests.adapters)
         response = Response()
 
@@ -0,0 +1,160 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Deque, Dict, Iterator, Tuple
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import threading
+import time
+
+from consts import Consts
+
+import logging
+logger = logging.getLogger('my_logger')
+
+
+class SecondaryRateGovernor:
+    """
+    Keeps requests under GitHub's secondary rate limits instead of reacting to them.
+
+    Two budgets are enforced before a request is sent:
+       - at most `max_concurrent` requests in flight,
+       - at most `points_per_minute` points per endpoint family in a sliding window,
+         where a GET/HEAD/OPTIONS request costs `Consts['SECONDARY_POINTS_GET']` points and
+         any other method `Consts['SECONDARY_POINTS_MUTATING']` points.
+
+    A request waits until both budgets allow it. A governor can be shared between
+    `Github` instances using the same token.
+
+    Attributes:
+        max_concurrent (int): Maximum number of concurrent requests.
+        points_per_minute (int): Maximum number of points per endpoint family and window.
+        window (float): Length of the sliding window in seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = Consts['SECONDARY_MAX_CONCURRENT_REQUESTS'],
+        points_per_minute: int = Consts['SECONDARY_POINTS_PER_MINUTE'],
+        window: float = 60.0,
+    ) -> None:
+        """
+        :param max_concurrent: Maximum number of concurrent requests.
+        :param points_per_minute: Maximum number of points per endpoint family and window.
+        :param window: Length of the sliding window in seconds.
+        """
+        assert isinstance(max_concurrent, int) and max_concurrent > 0, max_concurrent
+        assert isinstance(points_per_minute, int) and points_per_minute >= Consts['SECONDARY_POINTS_MUTATING'], points_per_minute
+        assert window > 0, window
+        self.max_concurrent = max_concurrent
+        self.points_per_minute = points_per_minute
+        self.window = window
+
+        self.__condition = threading.Condition()
+        self.__in_flight = 0
+        # per endpoint family: (admission time, cost) in admission order, and their sum
+        self.__admissions: Dict[str, Deque[Tuple[float, int]]] = defaultdict(deque)
+        self.__points: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def cost(method: str) -> int:
+        """
+        :return: The points a request with the given HTTP method costs.
+        """
+        if method.upper() in ("GET", "HEAD", "OPTIONS"):
+            return Consts['SECONDARY_POINTS_GET']
+        return Consts['SECONDARY_POINTS_MUTATING']
+
+    @staticmethod
+    def family(url: str) -> str:
+        """
+        The endpoint family of a request path, e.g. `/repos/{owner}/{repo}/commits`
+        for `/repos/octocat/Hello-World/commits/7fd1a60?page=2`.
+
+        :param url: The request path, relative to the API prefix.
+        :return: The endpoint family.
+        """
+        parts = [part for part in url.split("?", 1)[0].split("/") if part]
+        if parts[:1] == ["repos"] and len(parts) >= 3:
+            return "/".join(["", "repos", "{owner}", "{repo}"] + parts[3:4])
+        return "/" + "/".join(parts[:2])
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    def points(self, family: str) -> int:
+        """
+        :return: The points spent by an endpoint family in the current window.
+        """
+        with self.__condition:
+            self.__expire(family, time.monotonic())
+            return self.__points[family]
+
+    def __expire(self, family: str, now: float) -> None:
+        admissions = self.__admissions[family]
+        while admissions and admissions[0][0] <= now - self.window:
+            _, cost = admissions.popleft()
+            self.__points[family] -= cost
+
+    def try_acquire(self, method: str, url: str) -> Optional[float]:
+        """
+        Wait for a concurrency slot, and take it if the request fits into the points budget of its family.
+
+        Only the concurrency budget is waited for here, it is shared by all requests. A request whose
+        family is out of points is not admitted, so a scheduler can let other families go ahead meanwhile.
+
+        :param method: HTTP method of the request.
+        :param url: The request path, relative to the API prefix.
+        :return: None if the request was admitted (give the slot back with `release`),
+                 otherwise the seconds until its family's budget frees up.
+        """
+        cost = self.cost(method)
+        family = self.family(url)
+        with self.__condition:
+            while self.__in_flight >= self.max_concurrent:
+                logger.debug(f"{self.__in_flight} requests in flight, waiting for one to complete")
+                self.__condition.wait()
+            now = time.monotonic()
+            self.__expire(family, now)
+            if self.__points[family] + cost > self.points_per_minute:
+                # the budget frees up when the oldest admission leaves the window
+                wait = self.__admissions[family][0][0] + self.window - now
+                logger.debug(f"{family} spent {self.__points[family]} points, {wait:.1f}s until it frees up")
+                return wait
+            self.__in_flight += 1
+            self.__admissions[family].append((now, cost))
+            self.__points[family] += cost
+            return None
+
+    def acquire(self, method: str, url: str) -> None:
+        """
+        Wait until a request fits into both budgets and take its concurrency slot,
+        which must be given back with `release` once the request completed.
+
+        :param method: HTTP method of the request.
+        :param url: The request path, relative to the API prefix.
+        """
+        while (wait := self.try_acquire(method, url)) is not None:
+            time.sleep(wait)
+
+    def release(self) -> None:
+        """
+        Give back the concurrency slot of a completed request.
+        """
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__condition.notify_all()
+
+    @contextmanager
+    def admit(self, method: str, url: str) -> Iterator[None]:
+        """
+        Wait until a request fits into both budgets, and hold its concurrency slot while it runs.
+
+        :param method: HTTP method of the request.
+        :param url: The request path, relative to the API prefix.
+        """
+        self.acquire(method, url)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,153 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Any, Dict, List, NamedTuple, Union
+import json
+import re
+
+from consts import Consts
+from utils import parseLinkHeader, pageNumber
+
+# search responses start with the total count, so it can be read without decoding the page
+_TOTAL_COUNT_PATTERN = re.compile(r'\s*\{\s*"total_count"\s*:\s*(\d+)')
+
+
+class RateLimit(NamedTuple):
+    """
+    Snapshot of the rate limit headers of a response.
+
+    Attributes:
+        remaining (int): Requests remaining in the current window.
+        limit (int): Maximum number of requests in the window.
+        reset (Optional[int]): UTC epoch seconds at which the window resets.
+    """
+    remaining: int
+    limit: int
+    reset: Optional[int]
+
+
+class Page:
+    """
+    A single page of a paginated response.
+
+    The page metadata (number, links, last page, rate limit) comes from the response headers,
+    the body is only decoded when `data` or `items` is accessed, so pages can be filtered
+    on their metadata without paying for JSON decoding.
+
+    Attributes:
+        number (int): The page number, starting at 1.
+        headers (Dict[str, Any]): The response headers, with lower-case names.
+        text (str): The undecoded response body.
+    """
+    __slots__ = ("number", "headers", "text", "_data", "_links")
+
+    _UNDECODED = object()
+
+    def __init__(self, number: int, headers: Dict[str, Any], text: Union[str, bytes]):
+        """
+        :param number: The page number.
+        :param headers: The response headers, with lower-case names.
+        :param text: The response body.
+        """
+        self.number = number
+        self.headers = headers
+        self.text = text.decode('utf-8') if isinstance(text, bytes) else text
+        self._data: Any = Page._UNDECODED
+        self._links: Optional[Dict[str, str]] = None
+
+    @property
+    def is_raw(self) -> bool:
+        """
+        True if the body is raw or html content rather than JSON.
+        """
+        content_type = self.headers.get('content-type', '')
+        return Consts['headerRawJSON'] in content_type or Consts['headerHtmlJSON'] in content_type
+
+    @property
+    def data(self) -> Any:
+        """
+        The decoded response body, decoded on first access.
+
+        :return: The decoded JSON, the text for raw/html content, or None for an empty body.
+        """
+        if self._data is Page._UNDECODED:
+            if self.is_raw:
+                self._data = self.text
+            elif len(self.text) == 0:
+                self._data = None
+            else:
+                self._data = json.loads(self.text)
+        return self._data
+
+    @property
+    def items(self) -> List[Any]:
+        """
+        The items of the page.
+
+        Search results are unwrapped from their `items` key, a single object
+        (e.g. a file) or raw content is returned as the only item.
+        """
+        data = self.data
+        if data is None:
+            return []
+        if isinstance(data, str):
+            return [data]
+        if isinstance(data, dict):
+            if 'items' not in data:
+                return [data]
+            data = data['items']
+        return [element for element in data if element is not None]
+
+    @property
+    def links(self) -> Dict[str, str]:
+        """
+        The relations of the `Link` header, e.g. `next` and `last`.
+        """
+        if self._links is None:
+            self._links = parseLinkHeader(self.headers)
+        return self._links
+
+    @property
+    def next_url(self) -> Optional[str]:
+        return self.links.get("next")
+
+    @property
+    def last_page(self) -> Optional[int]:
+        """
+        The number of the last page, this page's number if there is no next page.
+        """
+        if "next" not in self.links:
+            return self.number
+        return pageNumber(self.links.get("last"))
+
+    @property
+    def total_count(self) -> Optional[int]:
+        """
+        The total number of results for search responses, None for other endpoints.
+        """
+        if self._data is Page._UNDECODED and not self.is_raw:
+            match = _TOTAL_COUNT_PATTERN.match(self.text)
+            if match:
+                return int(match.group(1))
+            if '"total_count"' not in self.text:
+                return None
+        data = self.data
+        return data.get('total_count') if isinstance(data, dict) else None
+
+    @property
+    def rate_limit(self) -> Optional[RateLimit]:
+        """
+        Snapshot of the rate limit when the page was received.
+        """
+        remaining = self.headers.get(Consts['headerRateRemaining'])
+        limit = self.headers.get(Consts['headerRateLimit'])
+        if remaining is None or limit is None:
+            return None
+        reset = self.headers.get(Consts['headerRateReset'].lower())
+        return RateLimit(
+            int(float(remaining)),
+            int(float(limit)),
+            int(float(reset)) if reset is not None else None,
+        )
+
+    def __repr__(self) -> str:
+        return f"Page(number={self.number}, last_page={self.last_page})"
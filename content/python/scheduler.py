@@ -0,0 +1,197 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Callable, Dict, Iterator, List, NamedTuple, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import heapq
+import itertools
+import threading
+import time
+
+import logging
+logger = logging.getLogger('my_logger')
+
+# priority classes, lower value is served first
+PRIORITIES: Dict[str, int] = {
+    'interactive': 0,
+    'default': 1,
+    'bulk': 2,
+}
+
+
+class Scheduling(NamedTuple):
+    """
+    How the requests of the current context are scheduled.
+
+    Attributes:
+        priority (str): One of `PRIORITIES`.
+        tag (str): The job the requests belong to, jobs of the same priority share the request slots fairly.
+        weight (float): The share of the job relative to the other jobs of the same priority.
+    """
+    priority: str = 'default'
+    tag: str = 'default'
+    weight: float = 1.0
+
+
+_scheduling: ContextVar[Scheduling] = ContextVar('scheduling', default=Scheduling())
+
+
+@contextmanager
+def scheduling(priority: str = 'default', tag: str = 'default', weight: float = 1.0) -> Iterator[Scheduling]:
+    """
+    Schedule the requests made in this context with the given priority, job tag and weight.
+
+    :param priority: One of `PRIORITIES`.
+    :param tag: The job the requests belong to.
+    :param weight: The share of the job relative to the other jobs of the same priority.
+    """
+    assert priority in PRIORITIES, priority
+    assert isinstance(tag, str), tag
+    assert weight > 0, weight
+    settings = Scheduling(priority, tag, weight)
+    reset = _scheduling.set(settings)
+    try:
+        yield settings
+    finally:
+        _scheduling.reset(reset)
+
+
+def current_scheduling() -> Scheduling:
+    """
+    :return: The scheduling of the current context.
+    """
+    return _scheduling.get()
+
+
+class RequestScheduler:
+    """
+    Hands out request slots, `seconds_between_requests` apart, by priority and fair share.
+
+    Waiting requests of a higher priority class are always served first. Within a class,
+    jobs (tags) share the slots by weighted fair queuing: each request gets a virtual
+    finish time of `max(virtual time, previous finish of its job) + 1 / weight` and the
+    request with the smallest finish time is served next, so a job with a backlog of
+    thousands of pages does not delay the few requests of another job.
+
+    A request can be admitted by a further budget (e.g. `SecondaryRateGovernor.try_acquire`) while
+    it holds its slot: no other request is granted until the admission returns, so the requests
+    pass that budget in the order of the scheduler too. An admission can also turn a request away
+    for some seconds (e.g. its endpoint family is out of points): the request is parked in its
+    queue until then, and the requests behind it go ahead. The next slot starts
+    `seconds_between_requests` after an admitted request.
+
+    A scheduler can be shared between `Github` instances that share a rate budget.
+    """
+
+    def __init__(self, seconds_between_requests: Optional[float] = None):
+        """
+        :param seconds_between_requests: Minimum delay between the start of consecutive requests.
+        """
+        assert seconds_between_requests is None or seconds_between_requests >= 0
+        self.seconds_between_requests = seconds_between_requests
+        self.__condition = threading.Condition()
+        self.__next_slot: float = 0
+        self.__granted = False
+        self.__virtual_time: float = 0
+        self.__finish: Dict[Tuple[int, str], float] = dict()
+        # per priority class: heap of (finish, sequence) of the waiting requests
+        self.__queues: List[List[Tuple[float, int]]] = [[] for _ in PRIORITIES]
+        # tickets turned away by their admission, and when they may try again
+        self.__parked: Dict[Tuple[float, int], float] = dict()
+        self.__sequence = itertools.count()
+
+    def __head(self, now: float) -> Optional[Tuple[float, int]]:
+        for queue in self.__queues:
+            if not self.__parked:
+                if queue:
+                    return queue[0]
+                continue
+            eligible = [ticket for ticket in queue if self.__parked.get(ticket, 0) <= now]
+            if eligible:
+                return min(eligible)
+        return None
+
+    def __unparked_in(self, now: float) -> Optional[float]:
+        """
+        :return: The seconds until the next parked ticket may try again, None if none is parked.
+        """
+        pending = [until for until in self.__parked.values() if until > now]
+        return min(pending) - now if pending else None
+
+    def __grant(self, ticket: Tuple[float, int], queue: List[Tuple[float, int]]) -> None:
+        """
+        Wait until the ticket is the first eligible one and its slot has come, then take the grant.
+        """
+        with self.__condition:
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.__granted or self.__head(now) != ticket:
+                        self.__condition.wait(self.__unparked_in(now))
+                    elif now < self.__next_slot:
+                        self.__condition.wait(self.__next_slot - now)
+                    else:
+                        break
+            except BaseException:
+                # e.g. a KeyboardInterrupt, a ticket left in the queue would block all later requests
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self.__parked.pop(ticket, None)
+                self.__condition.notify_all()
+                raise
+            queue.remove(ticket)
+            heapq.heapify(queue)
+            self.__parked.pop(ticket, None)
+            self.__virtual_time = max(self.__virtual_time, ticket[0])
+            self.__granted = True
+
+    def waiting(self) -> int:
+        """
+        :return: The number of requests waiting for a slot.
+        """
+        with self.__condition:
+            return sum(len(queue) for queue in self.__queues)
+
+    def acquire(
+        self,
+        settings: Optional[Scheduling] = None,
+        admit: Optional[Callable[[], Optional[float]]] = None,
+    ) -> None:
+        """
+        Wait for the slot of a request.
+
+        :param settings: The scheduling of the request, defaults to the one of the current context.
+        :param admit: Optional function called once the slot is granted, no other slot is granted until it
+                      returns. It returns None when the request may be sent, or the seconds to park it for.
+        """
+        if settings is None:
+            settings = _scheduling.get()
+        priority = PRIORITIES[settings.priority]
+        key = (priority, settings.tag)
+        queue = self.__queues[priority]
+
+        with self.__condition:
+            finish = max(self.__virtual_time, self.__finish.get(key, 0)) + 1 / settings.weight
+            self.__finish[key] = finish
+            ticket = (finish, next(self.__sequence))
+            heapq.heappush(queue, ticket)
+            # a new request may precede the current head, let it re-check
+            self.__condition.notify_all()
+
+        while True:
+            self.__grant(ticket, queue)
+            park: Optional[float] = None
+            try:
+                if admit is not None:
+                    park = admit()
+            finally:
+                with self.__condition:
+                    self.__granted = False
+                    if park is None:
+                        self.__next_slot = time.monotonic() + (self.seconds_between_requests or 0)
+                    else:
+                        self.__parked[ticket] = time.monotonic() + park
+                        heapq.heappush(queue, ticket)
+                    self.__condition.notify_all()
+            if park is None:
+                return
@@ -0,0 +1,216 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Optional, Any, BinaryIO, Dict, Iterator, List, NamedTuple
+import base64
+import hashlib
+import posixpath
+import shutil
+import tarfile
+import threading
+import zlib
+
+import logging
+logger = logging.getLogger('my_logger')
+
+
+class GunzipWriter:
+    """
+    A file-like writer decompressing gzip data into another file while it is written.
+
+    Used to store a downloaded tarball as an uncompressed tar archive, which can be read at any offset.
+    Data that is not gzip compressed (e.g. already decoded by the HTTP client) is written as is.
+    """
+
+    def __init__(self, output: BinaryIO):
+        """
+        :param output: The file receiving the decompressed data.
+        """
+        self.output = output
+        self.__decompressor: Optional[Any] = None
+        self.__started = False
+
+    def write(self, data: bytes) -> int:
+        if not self.__started and data:
+            self.__started = True
+            if data[:2] == b"\x1f\x8b":
+                self.__decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        if self.__decompressor is not None:
+            self.output.write(self.__decompressor.decompress(data))
+        else:
+            self.output.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        if self.__decompressor is not None:
+            self.output.write(self.__decompressor.flush())
+        self.output.flush()
+
+
+class Entry(NamedTuple):
+    """
+    A file, directory or symlink of a snapshot.
+
+    Attributes:
+        type (str): One of `file`, `dir` or `symlink`.
+        path (str): Path relative to the repository root.
+        size (int): Size of the file in bytes, 0 for directories.
+        offset (int): Offset of the file data in the tar archive.
+        target (Optional[str]): Target of a symlink.
+    """
+    type: str
+    path: str
+    size: int
+    offset: int
+    target: Optional[str] = None
+
+
+class Snapshot:
+    """
+    An indexed tar archive of a repository at a given ref.
+
+    The archive is indexed once when the snapshot is opened: the offset and size of every
+    file is recorded, so reading a file is a single seek and read, without extracting the archive.
+
+    Attributes:
+        path (str): Path of the uncompressed tar archive.
+        sha (Optional[str]): The commit SHA of the snapshot, if recorded in the archive.
+        temporary_directory (Optional[str]): Directory owned by the snapshot, removed when it is closed.
+    """
+
+    def __init__(self, path: str, temporary_directory: Optional[str] = None):
+        """
+        :param path: Path of an uncompressed `tarball` archive of a repository.
+        :param temporary_directory: Optional directory holding the archive, removed with it when the snapshot is closed.
+        """
+        self.path = path
+        self.temporary_directory = temporary_directory
+        self.__entries: Dict[str, Entry] = {"": Entry("dir", "", 0, 0)}
+        self.__children: Dict[str, List[str]] = {"": []}
+        self.__lock = threading.Lock()
+
+        with tarfile.open(path, "r:") as archive:
+            # GitHub records the commit SHA as the comment of the global pax header
+            self.sha = archive.pax_headers.get("comment")
+            for member in archive:
+                # the archive's top-level directory is `{owner}-{repo}-{sha}/`
+                _, _, name = member.name.partition("/")
+                name = name.rstrip("/")
+                if not name:
+                    continue
+                if member.isdir():
+                    entry = Entry("dir", name, 0, 0)
+                elif member.issym():
+                    entry = Entry("symlink", name, 0, 0, member.linkname)
+                elif member.isfile():
+                    entry = Entry("file", name, member.size, member.offset_data)
+                else:
+                    continue
+                self.__entries[name] = entry
+                self.__children.setdefault(posixpath.dirname(name), []).append(name)
+                if entry.type == "dir":
+                    self.__children.setdefault(name, [])
+
+        self.__file: Optional[BinaryIO] = open(path, "rb")
+        logger.debug(f"Indexed {len(self.__entries)} entries of {path}")
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """
+        :return: The path relative to the repository root, e.g. `content/docs` for `/content/docs/`.
+        """
+        return path.strip("/")
+
+    def entry(self, path: str) -> Optional[Entry]:
+        """
+        :param path: Path relative to the repository root.
+        :return: The entry of the path, or None if the snapshot does not contain it.
+        """
+        return self.__entries.get(self.normalize(path))
+
+    def read(self, path: str) -> bytes:
+        """
+        Read the content of a file.
+
+        :param path: Path relative to the repository root.
+        :return: The file content.
+        """
+        entry = self.entry(path)
+        if entry is None or entry.type != "file":
+            raise Exception(f'404 {{"message": "Not Found", "path": "{path}"}}')
+        with self.__lock:
+            assert self.__file is not None, "snapshot is closed"
+            self.__file.seek(entry.offset)
+            return self.__file.read(entry.size)
+
+    def listdir(self, path: str) -> List[Entry]:
+        """
+        :param path: Path of a directory relative to the repository root.
+        :return: The entries of the directory, sorted by name.
+        """
+        return [self.__entries[child] for child in sorted(self.__children.get(self.normalize(path), []))]
+
+    def __object(self, entry: Entry) -> Dict[str, Any]:
+        return {
+            "type": entry.type,
+            "name": posixpath.basename(entry.path),
+            "path": entry.path,
+            "size": entry.size,
+        }
+
+    def contents(self, path: str, content_type: Optional[str] = None) -> Iterator[Any]:
+        """
+        The contents of a path, shaped like the items of the contents API.
+
+        Like the API, the path is only looked up when the iterator is consumed,
+        a missing path raises the 404 then.
+
+        :param path: Path relative to the repository root.
+        :param content_type: `None`, `'raw'` or `'object'`, see `Github.contents`.
+        :return: For a directory, its entries (or one object with `entries` for `'object'`).
+                 For a file, one object with its base64 `content` and git blob `sha`,
+                 or its text for `'raw'`.
+        """
+        assert content_type in (None, 'raw', 'object'), content_type
+        entry = self.entry(path)
+        if entry is None:
+            raise Exception(f'404 {{"message": "Not Found", "path": "{path}"}}')
+
+        if entry.type == "dir":
+            if content_type == 'raw':
+                raise Exception(f'415 {{"message": "Raw content is not available for directories", "path": "{path}"}}')
+            entries = [self.__object(child) for child in self.listdir(entry.path)]
+            if content_type == 'object':
+                yield dict(self.__object(entry), entries=entries)
+            else:
+                yield from entries
+            return
+
+        if entry.type == "symlink":
+            yield dict(self.__object(entry), target=entry.target)
+            return
+
+        data = self.read(entry.path)
+        if content_type == 'raw':
+            yield data.decode("utf-8", errors="replace")
+            return
+        yield dict(
+            self.__object(entry),
+            sha=hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest(),
+            encoding="base64",
+            content=base64.b64encode(data).decode("ascii"),
+        )
+
+    def close(self) -> None:
+        """
+        Close the archive file, and remove the temporary directory owned by the snapshot.
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+            if self.temporary_directory is not None:
+                shutil.rmtree(self.temporary_directory, ignore_errors=True)
+                self.temporary_directory = None
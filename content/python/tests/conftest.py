@@ -0,0 +1,15 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+"""
+The modules are imported flat, as when running from `content/python`.
+
+Usage::
+
+    cd content/python
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
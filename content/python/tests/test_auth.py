@@ -0,0 +1,229 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import List, Optional, Tuple
+import threading
+import time
+
+import pytest
+
+from auth import AppAuth, AppInstallationAuth, AppInstallationPool
+from consts import Consts
+
+TIMEOUT = 5
+
+
+class Minter:
+    """
+    Replaces the token request of the installations, minting `tokens` in order.
+
+    A token is a tuple of its name and lifetime in seconds, or an exception to raise.
+    """
+
+    def __init__(self, tokens: List[Tuple[str, float] | Exception]):
+        self.tokens = list(tokens)
+        self.calls = 0
+        self.times: List[float] = []
+        self.minted = threading.Condition()
+
+    def __call__(self, installation: AppInstallationAuth) -> Tuple[str, float]:
+        with self.minted:
+            token = self.tokens[min(self.calls, len(self.tokens) - 1)]
+            self.calls += 1
+            self.times.append(time.monotonic())
+            self.minted.notify_all()
+        if isinstance(token, Exception):
+            raise token
+        name, lifetime = token
+        return f"{name}-{installation.installation_id}", time.time() + lifetime
+
+    def wait(self, calls: int) -> None:
+        with self.minted:
+            assert self.minted.wait_for(lambda: self.calls >= calls, TIMEOUT)
+
+
+def installation(minter: Minter, monkeypatch, refresh_margin: int = 300, installation_id: int = 1) -> AppInstallationAuth:
+    monkeypatch.setattr(AppInstallationAuth, "_AppInstallationAuth__mint", lambda auth: minter(auth))
+    return AppInstallationAuth(AppAuth(1, "key"), installation_id, refresh_margin=refresh_margin)
+
+
+def refreshed(auth: AppInstallationAuth) -> None:
+    # the background refresh holds the lock until the new token is stored
+    with auth._lock:
+        pass
+
+
+def authorization(auth: AppInstallationAuth) -> str:
+    headers = {}
+    auth.authentication(headers)
+    return headers["Authorization"]
+
+
+def test_token_is_minted_once(monkeypatch):
+    minter = Minter([("first", 3600)])
+    auth = installation(minter, monkeypatch)
+    assert authorization(auth) == "token first-1"
+    assert authorization(auth) == "token first-1"
+    assert minter.calls == 1
+    auth.close()
+
+
+def test_token_is_refreshed_in_the_background(monkeypatch):
+    # the refresh is due 0.05s after minting
+    minter = Minter([("first", 300.05), ("second", 3600)])
+    auth = installation(minter, monkeypatch)
+    assert authorization(auth) == "token first-1"
+    minter.wait(2)
+    refreshed(auth)
+    assert authorization(auth) == "token second-1"
+    assert minter.calls == 2
+    auth.close()
+
+
+def test_failed_refresh_keeps_the_token(monkeypatch):
+    minter = Minter([("first", 300.05), Exception("502")])
+    auth = installation(minter, monkeypatch)
+    assert authorization(auth) == "token first-1"
+    minter.wait(2)
+    refreshed(auth)
+    # still valid for 300s, the refresh is retried in 5s
+    assert authorization(auth) == "token first-1"
+    assert minter.calls == 2
+    auth.close()
+
+
+def test_failed_refresh_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setitem(Consts, 'TOKEN_REFRESH_RETRY_MIN', 0.05)
+    monkeypatch.setitem(Consts, 'TOKEN_REFRESH_RETRY_MAX', 0.2)
+    minter = Minter([("first", 300.05), Exception("502"), Exception("502"), Exception("502"), Exception("502"), ("sixth", 3600)])
+    auth = installation(minter, monkeypatch)
+    assert authorization(auth) == "token first-1"
+    minter.wait(6)
+    refreshed(auth)
+    assert authorization(auth) == "token sixth-1"
+    gaps = [b - a for a, b in zip(minter.times[1:], minter.times[2:])]
+    # 0.05, 0.1, 0.2, then capped at 0.2
+    assert gaps[0] >= 0.045
+    assert gaps[1] >= 0.095
+    assert gaps[2] >= 0.19
+    assert 0.19 <= gaps[3] < 0.35
+    auth.close()
+
+
+def test_refresh_stops_after_expiry(monkeypatch):
+    # the refresh is due when the token expires after 0.05s, and keeps failing
+    minter = Minter([("first", 0.05), Exception("502")])
+    auth = installation(minter, monkeypatch, refresh_margin=0)
+    assert authorization(auth) == "token first-1"
+    minter.wait(2)
+    time.sleep(0.2)
+    assert minter.calls == 2
+    # the next request mints inline, and fails like the API would
+    with pytest.raises(Exception, match="502"):
+        authorization(auth)
+    assert minter.calls == 3
+    auth.close()
+
+
+def test_expired_token_is_minted_on_next_use_after_failed_refresh(monkeypatch):
+    minter = Minter([("first", 0.05), Exception("502"), ("third", 3600)])
+    auth = installation(minter, monkeypatch, refresh_margin=0)
+    assert authorization(auth) == "token first-1"
+    minter.wait(2)
+    refreshed(auth)
+    assert authorization(auth) == "token third-1"
+    assert minter.calls == 3
+    auth.close()
+
+
+def test_close_stops_the_refresh(monkeypatch):
+    minter = Minter([("first", 300.05), ("second", 3600)])
+    auth = installation(minter, monkeypatch)
+    authorization(auth)
+    auth.close()
+    time.sleep(0.15)
+    assert minter.calls == 1
+
+
+def test_expired_token_is_minted_inline(monkeypatch):
+    minter = Minter([("first", 0), ("second", 3600)])
+    auth = installation(minter, monkeypatch, refresh_margin=0)
+    auth.close()
+    assert authorization(auth) == "token first-1"
+    time.sleep(0.01)
+    assert authorization(auth) == "token second-1"
+
+
+@pytest.fixture
+def lookups(monkeypatch) -> List[Tuple[str, str]]:
+    monkeypatch.setattr(AppInstallationAuth, "_AppInstallationAuth__mint", lambda auth: Minter([("token", 3600)])(auth))
+    calls: List[Tuple[str, str]] = []
+
+    def get_installation_id(app: AppAuth, account: str, **kwargs) -> Optional[int]:
+        calls.append((app.app_id, account))
+        # app `a` is installed on octocat (1) and github (2), app `b` on octocat (3)
+        return {("a", "octocat"): 1, ("a", "github"): 2, ("b", "octocat"): 3}.get((app.app_id, account.split("/")[2]))
+
+    monkeypatch.setattr(AppAuth, "get_installation_id", get_installation_id)
+    return calls
+
+
+def pool(**kwargs) -> AppInstallationPool:
+    a, b = AppAuth("a", "key"), AppAuth("b", "key")
+    return AppInstallationPool([a.get_installation_auth(1), a.get_installation_auth(2), b.get_installation_auth(3)], **kwargs)
+
+
+def ids(pool: AppInstallationPool, url: str, count: int) -> List[int]:
+    return [pool.select(url).installation_id for _ in range(count)]
+
+
+def test_pool_selects_installations_of_the_owner(lookups):
+    auth = pool()
+    assert ids(auth, "/repos/github/docs/commits", 3) == [2, 2, 2]
+    assert ids(auth, "/repos/octocat/Hello-World/commits?page=2", 4) == [1, 3, 1, 3]
+    assert ids(auth, "/repos/OctoCat/Spoon-Knife", 2) == [1, 3]
+    # each app is asked once per owner
+    assert lookups == [
+        ("a", "/repos/github/docs"), ("b", "/repos/github/docs"),
+        ("a", "/repos/octocat/Hello-World"), ("b", "/repos/octocat/Hello-World"),
+    ]
+    auth.close()
+
+
+def test_pool_uses_all_installations_without_owner(lookups):
+    auth = pool()
+    assert ids(auth, "/search/repositories?q=x", 3) == [1, 2, 3]
+    assert ids(auth, "/repos/unknown/repo", 3) == [1, 2, 3]
+    auth.close()
+
+
+def test_pool_owners_mapping(lookups):
+    auth = pool(owners={"octocat": [3]})
+    assert ids(auth, "/orgs/octocat/repos", 2) == [3, 3]
+    assert lookups == []
+    auth.close()
+
+
+def test_installation_lookup_uses_client_settings(monkeypatch):
+    import requests
+
+    sent = {}
+
+    class Response:
+        status_code = 200
+
+        @staticmethod
+        def json():
+            return {"id": 7}
+
+    def get(url, headers, timeout, verify):
+        sent.update(url=url, headers=headers, timeout=timeout, verify=verify)
+        return Response()
+
+    monkeypatch.setattr(requests, "get", get)
+    monkeypatch.setattr(AppAuth, "create_jwt", lambda app: ("jwt", time.time() + 600))
+    app = AppAuth(1, "key")
+    assert app.get_installation_id("/repos/octocat/Hello-World", timeout=3, user_agent="crawler", verify="/ca.pem") == 7
+    assert sent["url"] == "https://api.github.com/repos/octocat/Hello-World/installation"
+    assert sent["headers"]["User-Agent"] == "crawler"
+    assert sent["headers"]["Authorization"] == "Bearer jwt"
+    assert (sent["timeout"], sent["verify"]) == (3, "/ca.pem")
@@ -0,0 +1,41 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from cache import CommitCache
+
+SHA = "7fd1a60b01f91b314f59955a4e4d4e80d8edf11d"
+
+
+def test_key():
+    assert CommitCache.key("octocat", "Hello-World", SHA.upper()) == SHA
+    assert CommitCache.key("OctoCat", "Hello-World", "7FD1A60") == "octocat/hello-world@7fd1a60"
+    assert CommitCache.key("octocat", "Hello-World", "main") is None
+    assert CommitCache.key("octocat", "Hello-World", "7fd") is None
+
+
+def test_aliases_are_scoped_to_the_repository():
+    cache = CommitCache()
+    cache.put({"sha": SHA}, alias=CommitCache.key("octocat", "Hello-World", "7fd1a60"))
+    assert cache.get(SHA) == {"sha": SHA}
+    assert cache.get(CommitCache.key("octocat", "Hello-World", "7fd1a60")) == {"sha": SHA}
+    assert cache.get(CommitCache.key("octocat", "Spoon-Knife", "7fd1a60")) is None
+    assert cache.get(None) is None
+    assert len(cache) == 1
+
+
+def test_get_returns_copies():
+    cache = CommitCache()
+    commit = {"sha": SHA, "files": [{"filename": "README"}]}
+    cache.put(commit)
+    commit["files"].append({"filename": "put"})
+    cached = cache.get(SHA)
+    cached["files"].append({"filename": "get"})
+    assert cache.get(SHA) == {"sha": SHA, "files": [{"filename": "README"}]}
+
+
+def test_directory_is_shared(tmp_path):
+    CommitCache(str(tmp_path)).put({"sha": SHA}, alias=CommitCache.key("octocat", "Hello-World", "7fd1a60"))
+    assert (tmp_path / f"{SHA}.json").exists()
+    cache = CommitCache(str(tmp_path))
+    assert SHA in cache
+    # aliases are kept in memory only
+    assert CommitCache.key("octocat", "Hello-World", "7fd1a60") not in cache
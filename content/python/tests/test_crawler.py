@@ -0,0 +1,104 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Any, Dict, Iterator, List
+import json
+import queue
+
+import pytest
+
+import crawler
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+COMMITS = [
+    {"sha": "1", "files": [{"filename": "a"}]},
+    {"sha": "2", "files": []},
+    # a nested key first seen in the second batch
+    {"sha": "3", "files": [{"filename": "b", "previous_filename": "c"}]},
+    # and a key missing from it
+    {"sha": "4"},
+    {"sha": "5", "stats": {"total": 1}},
+]
+
+
+@pytest.fixture
+def batch_size(monkeypatch) -> None:
+    monkeypatch.setattr(crawler, "PARQUET_BATCH_SIZE", 2)
+
+
+def rows(paths: List[str]) -> List[Dict[str, Any]]:
+    return [row for path in paths for row in pyarrow.parquet.read_table(path).to_pylist()]
+
+
+def test_write_parquet_keeps_keys_of_all_rows(tmp_path):
+    # `sha` 2 has no `files`, `sha` 1 has no `stats`, both in the same batch
+    paths = crawler.write_parquet(str(tmp_path / "shard.parquet"), [{"sha": "1", "files": []}, {"sha": "2", "stats": {"total": 1}}])
+    assert rows(paths) == [{"sha": "1", "files": [], "stats": None}, {"sha": "2", "files": None, "stats": {"total": 1}}]
+
+
+def test_write_parquet_starts_a_part_on_new_keys(tmp_path, batch_size):
+    paths = crawler.write_parquet(str(tmp_path / "shard.parquet"), iter(COMMITS))
+    assert paths == [str(tmp_path / name) for name in ("shard.parquet", "shard-1.parquet", "shard-2.parquet")]
+    assert [row["sha"] for row in rows(paths)] == ["1", "2", "3", "4", "5"]
+    assert rows(paths)[2]["files"] == [{"filename": "b", "previous_filename": "c"}]
+    # `sha` 4 lacks `files`, it is written to the part of `sha` 3
+    assert pyarrow.parquet.read_table(paths[1]).num_rows == 2
+
+
+def test_write_parquet_without_records(tmp_path):
+    paths = crawler.write_parquet(str(tmp_path / "shard.parquet"), [])
+    assert rows(paths) == []
+
+
+def test_merge_unifies_parts(tmp_path, batch_size):
+    paths = crawler.write_parquet(str(tmp_path / "shard-0000.parquet"), COMMITS[:3])
+    paths += crawler.write_parquet(str(tmp_path / "shard-0001.parquet"), [])
+    paths += crawler.write_parquet(str(tmp_path / "shard-0002.parquet"), COMMITS[3:])
+    merged = pyarrow.parquet.read_table(crawler.merge(paths, str(tmp_path), "parquet")).to_pylist()
+    assert [row["sha"] for row in merged] == ["1", "2", "3", "4", "5"]
+    assert merged[0] == {"sha": "1", "files": [{"filename": "a", "previous_filename": None}], "stats": None}
+    assert merged[2]["files"] == [{"filename": "b", "previous_filename": "c"}]
+    assert merged[4]["stats"] == {"total": 1}
+
+
+def test_merge_jsonl(tmp_path):
+    for index, commit in enumerate(COMMITS[:2]):
+        (tmp_path / f"shard-{index}.jsonl").write_text(json.dumps(commit) + "\n")
+    path = crawler.merge([str(tmp_path / f"shard-{index}.jsonl") for index in range(2)], str(tmp_path), "jsonl")
+    assert [json.loads(line) for line in open(path)] == COMMITS[:2]
+
+
+class Github:
+    """
+    Replaces the client of the crawler, the commits of `broken/repo` fail after the first one.
+    """
+
+    def __init__(self, **kwargs: Any):
+        pass
+
+    def commits(self, owner: str, repo: str, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        yield {"sha": f"{owner}-1"}
+        if owner == "broken":
+            raise Exception("502")
+        yield {"sha": f"{owner}-2"}
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.mark.parametrize("format", crawler.FORMATS)
+def test_crawl_shard_reports_failed_repositories(tmp_path, monkeypatch, format):
+    monkeypatch.setattr(crawler, "Github", Github)
+    progress = queue.Queue()
+    index, paths, count, failed = crawler.crawl_shard(
+        3, ["octocat/repo", "broken/repo", "github/repo"], ["token"], str(tmp_path), format, {}, {}, progress)
+    assert (index, count, failed) == (3, 5, ["broken/repo"])
+    assert [progress.get_nowait() for _ in range(3)] == [
+        (3, "octocat/repo", 2, False), (3, "broken/repo", 1, True), (3, "github/repo", 2, False),
+    ]
+    if format == "jsonl":
+        written = [json.loads(line)["sha"] for path in paths for line in open(path)]
+    else:
+        written = [row["sha"] for row in rows(paths)]
+    assert written == ["octocat-1", "octocat-2", "broken-1", "github-1", "github-2"]
@@ -0,0 +1,168 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Any, Callable, Dict, List, Tuple
+import json
+
+import pytest
+
+import github_client
+from auth import Token
+from github_client import Github
+from test_snapshot import tarball
+
+NEXT = '<https://api.github.com/repositories/1/commits?page={page}>; rel="next"'
+
+
+class Connection:
+    """
+    Replaces the HTTPS connection of the client, answering requests with `handler(url)`.
+    """
+
+    handler: Callable[[str], Tuple[int, Dict[str, str], str]]
+    urls: List[str]
+
+    def __init__(self, host: str, port: Any = None, **kwargs: Any):
+        pass
+
+    def request(self, verb: str, url: str, input: Any, headers: Dict[str, str]) -> None:
+        self.url = url
+
+    def getresponse(self) -> "Connection":
+        Connection.urls.append(self.url)
+        self.status, self.headers, self.body = Connection.handler(self.url)
+        return self
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.body
+
+    def download(self, url: str, headers: Dict[str, str], output: Any, allowed_hosts: Any) -> Tuple[int, Dict[str, str]]:
+        Connection.urls.append(url)
+        status, headers, body = Connection.handler(url)
+        output.write(body)
+        return status, headers
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def github(monkeypatch) -> Github:
+    Connection.urls = []
+    Connection.handler = lambda url: (200, {}, "[]")
+    monkeypatch.setattr(github_client, "HTTPSRequestsConnectionClass", Connection)
+    client = Github(auth=Token("token"), seconds_between_requests=None)
+    yield client
+    client.close()
+
+
+def commits(url: str) -> Tuple[int, Dict[str, str], str]:
+    """ Three pages of commits, the page number is the commit SHA. """
+    page = int(url.rsplit("page=", 1)[1]) if "page=" in url else 1
+    headers = {"link": NEXT.format(page=page + 1)} if page < 3 else {}
+    return 200, headers, json.dumps([{"sha": str(page)}])
+
+
+@pytest.mark.parametrize("url, params, first", [
+    ("/repos/o/r/commits", {"sha": "main"}, "/repos/o/r/commits?sha=main"),
+    ("https://api.github.com/repos/o/r/commits", None, "/repos/o/r/commits"),
+    ("https://api.github.com/repos/o/r/commits", {"sha": "main"}, "/repos/o/r/commits?sha=main"),
+    ("/repos/o/r/commits?sha=main", None, "/repos/o/r/commits?sha=main"),
+    ("/repos/o/r/commits?sha=main", {"sha": "dev"}, "/repos/o/r/commits?sha=dev"),
+])
+def test_paginator_urls(github, url, params, first):
+    Connection.handler = commits
+    assert [commit["sha"] for commit in github.paginator(url, params)] == ["1", "2", "3"]
+    assert Connection.urls == [first, "/repositories/1/commits?page=2", "/repositories/1/commits?page=3"]
+
+
+def test_pages_numbers(github):
+    Connection.handler = commits
+    assert [page.number for page in github.pages("/repos/o/r/commits", {"page": 2})] == [2, 3]
+    assert [page.number for page in github.pages("/repos/o/r/commits?page=2")] == [2, 3]
+
+
+def test_snapshot_serves_contents(github, tmp_path):
+    Connection.handler = lambda url: (200, {}, tarball())
+    snapshot = github.snapshot("octocat", "Hello-World", ref="main", directory=str(tmp_path))
+    assert Connection.urls == ["/repos/octocat/Hello-World/tarball/main"]
+    assert snapshot.path == str(tmp_path / "octocat-Hello-World-main.tar")
+    assert list(github.contents("octocat", "Hello-World", "README", ref="main", content_type="raw")) == ["Hello World!\n"]
+    assert len(Connection.urls) == 1
+
+    # other refs are requested
+    Connection.handler = lambda url: (200, {}, "[]")
+    assert list(github.contents("octocat", "Hello-World", "README")) == []
+    assert Connection.urls[1:] == ["/repos/octocat/Hello-World/contents/README"]
+
+
+def test_contents_after_close_are_requested(github, tmp_path):
+    Connection.handler = lambda url: (200, {}, tarball())
+    github.snapshot("octocat", "Hello-World", ref="main", directory=str(tmp_path))
+    github.close()
+    Connection.handler = lambda url: (200, {}, json.dumps([{"name": "README"}]))
+    assert list(github.contents("octocat", "Hello-World", "README", ref="main")) == [{"name": "README"}]
+    assert Connection.urls[1:] == ["/repos/octocat/Hello-World/contents/README?ref=main"]
+
+
+def details(url: str) -> Tuple[int, Dict[str, str], str]:
+    """ The commit named by `/repos/o/r/commits/{ref}`, the tag `cafe` names the commit `1234...`. """
+    ref = url.rsplit("/", 1)[1]
+    sha = {"cafe": "1234"}.get(ref, ref).ljust(40, "0")
+    return 200, {}, json.dumps({"sha": sha, "files": []})
+
+
+def test_commit_details_are_cached(github):
+    Connection.handler = details
+    full = "abcd".ljust(40, "0")
+    assert [commit["sha"] for commit in github.commit_details("o", "r", [full, "abcd", full])] == [full, full]
+    assert [commit["sha"] for commit in github.commit_details("o", "r", ["abcd", full])] == [full, full]
+    assert Connection.urls == [f"/repos/o/r/commits/{full}", "/repos/o/r/commits/abcd"]
+
+    # yielded commits are copies
+    next(github.commit_details("o", "r", [full]))["files"].append("changed")
+    assert next(github.commit_details("o", "r", [full]))["files"] == []
+
+
+def test_refs_named_like_shas_are_not_aliased(github):
+    Connection.handler = details
+    assert next(github.commit_details("o", "r", ["cafe"]))["sha"] == "1234".ljust(40, "0")
+    # the tag `cafe` is not an alias of its commit, it is requested again, the abbreviated SHA `1234` is
+    assert next(github.commit_details("o", "r", ["cafe"]))["sha"] == "1234".ljust(40, "0")
+    assert next(github.commit_details("o", "r", ["1234"]))["sha"] == "1234".ljust(40, "0")
+    assert next(github.commit_details("o", "r", ["1234"]))["sha"] == "1234".ljust(40, "0")
+    assert Connection.urls == ["/repos/o/r/commits/cafe", "/repos/o/r/commits/cafe", "/repos/o/r/commits/1234"]
+
+
+def compare(url: str) -> Tuple[int, Dict[str, str], str]:
+    """ Three pages of a comparison of 5 commits, the files are only listed on the first page. """
+    page = int(url.rsplit("page=", 1)[1]) if "&page=" in url else 1
+    commits = [{"sha": str(sha)} for sha in range(2 * page - 1, min(2 * page, 5) + 1)]
+    body = {"status": "ahead", "ahead_by": 5, "behind_by": 0, "total_commits": 5, "commits": commits}
+    if page == 1:
+        body.update(files=[{"filename": "README"}], html_url="https://github.com/o/r/compare/v1...v2")
+    link = f'<https://api.github.com/repos/o/r/compare/v1...v2?per_page=100&page={page + 1}>; rel="next"'
+    return 200, {"link": link} if page < 3 else {}, json.dumps(body)
+
+
+def test_compare_streams_commits(github):
+    Connection.handler = compare
+    comparison = github.compare("o", "r", "v1", "v2")
+    assert (comparison.status, comparison.ahead_by, comparison.behind_by, comparison.total_commits) == ("ahead", 5, 0, 5)
+    assert comparison.files == [{"filename": "README"}]
+    assert comparison.html_url == "https://github.com/o/r/compare/v1...v2"
+    assert repr(comparison) == "Comparison(status='ahead', total_commits=5, files=1)"
+    assert Connection.urls == ["/repos/o/r/compare/v1...v2?per_page=100"]
+
+    commits = iter(comparison)
+    assert [next(commits)["sha"] for _ in range(2)] == ["1", "2"]
+    assert len(Connection.urls) == 1
+    assert [commit["sha"] for commit in commits] == ["3", "4", "5"]
+    assert Connection.urls[1:] == ["/repos/o/r/compare/v1...v2?per_page=100&page=2", "/repos/o/r/compare/v1...v2?per_page=100&page=3"]
+    # the files of the first page are kept
+    assert comparison.files == [{"filename": "README"}]
+
+    with pytest.raises(AssertionError, match="only be iterated once"):
+        list(comparison)
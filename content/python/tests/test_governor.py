@@ -0,0 +1,71 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+import threading
+import time
+
+from consts import Consts
+from governor import SecondaryRateGovernor
+
+TIMEOUT = 5
+COMMITS = "/repos/{owner}/{repo}/commits"
+
+
+def test_family():
+    assert SecondaryRateGovernor.family("/repos/octocat/Hello-World/commits/7fd1a60?page=2") == COMMITS
+    assert SecondaryRateGovernor.family("/repos/octocat/Hello-World") == "/repos/{owner}/{repo}"
+    assert SecondaryRateGovernor.family("/search/repositories?q=x") == "/search/repositories"
+
+
+def test_cost():
+    assert SecondaryRateGovernor.cost("get") == Consts['SECONDARY_POINTS_GET']
+    assert SecondaryRateGovernor.cost("POST") == Consts['SECONDARY_POINTS_MUTATING']
+
+
+def test_points_budget_waits_for_the_window():
+    governor = SecondaryRateGovernor(max_concurrent=10, points_per_minute=5, window=0.2)
+    start = time.monotonic()
+    for _ in range(5):
+        with governor.admit("GET", "/repos/octocat/Hello-World/commits"):
+            pass
+    assert governor.points(COMMITS) == 5
+    assert time.monotonic() - start < 0.1
+
+    # other families have their own budget
+    with governor.admit("GET", "/search/repositories"):
+        pass
+    assert time.monotonic() - start < 0.1
+
+    with governor.admit("GET", "/repos/octocat/Spoon-Knife/commits"):
+        pass
+    assert time.monotonic() - start >= 0.19
+    assert governor.points(COMMITS) == 1
+
+
+def test_mutating_requests_cost_more():
+    governor = SecondaryRateGovernor(max_concurrent=10, points_per_minute=5, window=0.2)
+    start = time.monotonic()
+    with governor.admit("POST", "/repos/octocat/Hello-World/issues"):
+        pass
+    with governor.admit("GET", "/repos/octocat/Hello-World/issues"):
+        pass
+    assert time.monotonic() - start >= 0.19
+
+
+def test_concurrency_limit():
+    governor = SecondaryRateGovernor(max_concurrent=1)
+    governor.acquire("GET", "/rate_limit")
+    assert governor.in_flight == 1
+
+    admitted = threading.Event()
+
+    def request() -> None:
+        with governor.admit("GET", "/rate_limit"):
+            admitted.set()
+
+    thread = threading.Thread(target=request, daemon=True)
+    thread.start()
+    assert not admitted.wait(0.1)
+    governor.release()
+    assert admitted.wait(TIMEOUT)
+    thread.join(TIMEOUT)
+    assert governor.in_flight == 0
@@ -0,0 +1,63 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+import json
+
+import pytest
+
+from page import Page, RateLimit
+
+LINK = (
+    '<https://api.github.com/repositories/1/commits?page=3>; rel="next", '
+    '<https://api.github.com/repositories/1/commits?per_page=100&page=7>; rel="last"'
+)
+
+
+def test_items_are_decoded_lazily():
+    page = Page(2, {"link": LINK}, b'[{"sha": "1"}, null, {"sha": "2"}]')
+    assert page._data is Page._UNDECODED
+    assert page.items == [{"sha": "1"}, {"sha": "2"}]
+    assert page.data == [{"sha": "1"}, None, {"sha": "2"}]
+
+
+def test_items_of_objects():
+    assert Page(1, {}, '{"total_count": 2, "items": [{"id": 1}, {"id": 2}]}').items == [{"id": 1}, {"id": 2}]
+    assert Page(1, {}, '{"name": "README"}').items == [{"name": "README"}]
+    assert Page(1, {}, "").items == []
+    assert Page(1, {"content-type": "application/vnd.github.raw+json"}, "# README").items == ["# README"]
+
+
+def test_invalid_body_raises_when_accessed():
+    page = Page(1, {}, "<html>")
+    with pytest.raises(ValueError):
+        page.items
+
+
+def test_links():
+    page = Page(2, {"link": LINK}, "[]")
+    assert page.next_url == "https://api.github.com/repositories/1/commits?page=3"
+    assert page.last_page == 7
+    assert repr(page) == "Page(number=2, last_page=7)"
+
+    last = Page(7, {"link": '<https://api.github.com/repositories/1/commits?page=6>; rel="prev first"'}, "[]")
+    assert last.next_url is None
+    assert last.links["first"] == last.links["prev"]
+    assert last.last_page == 7
+
+
+def test_total_count_without_decoding():
+    page = Page(1, {}, json.dumps({"total_count": 1234, "incomplete_results": False, "items": []}))
+    assert page.total_count == 1234
+    assert page._data is Page._UNDECODED
+    assert Page(1, {}, '[{"sha": "1"}]').total_count is None
+
+
+def test_total_count_after_other_keys():
+    page = Page(1, {}, '{"incomplete_results": false, "total_count": 3, "items": []}')
+    assert page.total_count == 3
+    assert Page(1, {"content-type": "application/vnd.github.html+json"}, '"total_count": 3').total_count is None
+
+
+def test_rate_limit():
+    headers = {"x-ratelimit-remaining": "4999", "x-ratelimit-limit": "5000", "x-ratelimit-reset": "1700000000"}
+    assert Page(1, headers, "[]").rate_limit == RateLimit(4999, 5000, 1700000000)
+    assert Page(1, {}, "[]").rate_limit is None
@@ -0,0 +1,177 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Callable, List, Optional
+import signal
+import threading
+import time
+
+import pytest
+
+from governor import SecondaryRateGovernor
+from scheduler import RequestScheduler, Scheduling
+
+TIMEOUT = 5
+
+
+def wait_until(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class Requests:
+    """
+    Requests queued one by one behind a request holding the slot, so their order is known.
+    """
+
+    def __init__(self, scheduler: RequestScheduler):
+        self.scheduler = scheduler
+        self.granted: List[str] = []
+        self.threads: List[threading.Thread] = []
+        self.release = threading.Event()
+        holding = threading.Event()
+
+        def hold() -> None:
+            holding.set()
+            self.release.wait(TIMEOUT)
+
+        self.add("holder", Scheduling(tag="holder"), admit=hold)
+        assert holding.wait(TIMEOUT)
+
+    def add(self, name: str, settings: Scheduling, admit: Optional[Callable[[], Optional[float]]] = None) -> None:
+        def admitted() -> Optional[float]:
+            park = admit() if admit is not None else None
+            if park is None:
+                self.granted.append(name)
+            return park
+
+        def run() -> None:
+            self.scheduler.acquire(settings, admit=admitted)
+
+        waiting = self.scheduler.waiting()
+        thread = threading.Thread(target=run, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+        if len(self.threads) > 1:
+            wait_until(lambda: self.scheduler.waiting() == waiting + 1)
+
+    def run(self) -> List[str]:
+        self.release.set()
+        for thread in self.threads:
+            thread.join(TIMEOUT)
+        return self.granted[1:]
+
+
+def test_priority_classes_are_served_in_order():
+    requests = Requests(RequestScheduler())
+    requests.add("bulk", Scheduling(priority="bulk"))
+    requests.add("default", Scheduling(priority="default"))
+    requests.add("interactive", Scheduling(priority="interactive"))
+    assert requests.run() == ["interactive", "default", "bulk"]
+
+
+def test_jobs_share_slots_by_weight():
+    requests = Requests(RequestScheduler())
+    for i in range(4):
+        requests.add(f"heavy{i}", Scheduling(tag="heavy", weight=2))
+    for i in range(4):
+        requests.add(f"light{i}", Scheduling(tag="light", weight=1))
+    granted = requests.run()
+    assert granted[:6] == ["heavy0", "heavy1", "light0", "heavy2", "heavy3", "light1"]
+    assert granted[6:] == ["light2", "light3"]
+
+
+def test_new_job_is_not_queued_behind_backlog():
+    requests = Requests(RequestScheduler())
+    for i in range(5):
+        requests.add(f"backlog{i}", Scheduling(tag="backlog"))
+    requests.add("lookup", Scheduling(tag="lookup"))
+    assert requests.run().index("lookup") == 1
+
+
+def test_slots_are_spaced():
+    scheduler = RequestScheduler(seconds_between_requests=0.05)
+    starts = []
+    for _ in range(3):
+        scheduler.acquire(Scheduling())
+        starts.append(time.monotonic())
+    assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="needs SIGALRM")
+def test_interrupted_wait_leaves_the_queue():
+    scheduler = RequestScheduler(seconds_between_requests=0.3)
+    scheduler.acquire(Scheduling())
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, 0.05)
+        with pytest.raises(KeyboardInterrupt):
+            scheduler.acquire(Scheduling())
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    assert scheduler.waiting() == 0
+
+    thread = threading.Thread(target=scheduler.acquire, args=(Scheduling(),), daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive()
+
+
+def test_governor_is_passed_in_priority_order():
+    governor = SecondaryRateGovernor(max_concurrent=1)
+    scheduler = RequestScheduler()
+    admitted: List[str] = []
+    granted = threading.Event()
+
+    def request(name: str, settings: Scheduling) -> threading.Thread:
+        def admit() -> Optional[float]:
+            granted.set()
+            return governor.try_acquire("GET", "/rate_limit")
+
+        def run() -> None:
+            scheduler.acquire(settings, admit=admit)
+            admitted.append(name)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    # a request in flight fills the governor, the next one holds the slot while waiting for it
+    governor.acquire("GET", "/rate_limit")
+    threads = [request("first", Scheduling(priority="bulk"))]
+    assert granted.wait(TIMEOUT)
+    threads.append(request("bulk", Scheduling(priority="bulk")))
+    wait_until(lambda: scheduler.waiting() == 1)
+    threads.append(request("interactive", Scheduling(priority="interactive")))
+    wait_until(lambda: scheduler.waiting() == 2)
+
+    for count in range(1, 4):
+        governor.release()
+        wait_until(lambda: len(admitted) == count)
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert admitted == ["first", "interactive", "bulk"]
+
+
+def test_exhausted_family_does_not_block_other_families():
+    governor = SecondaryRateGovernor(max_concurrent=10, points_per_minute=5, window=0.3)
+    for _ in range(5):
+        with governor.admit("GET", "/repos/octocat/Hello-World/commits"):
+            pass
+    requests = Requests(RequestScheduler())
+    requests.add("commits", Scheduling(priority="interactive"),
+                 admit=lambda: governor.try_acquire("GET", "/repos/octocat/Spoon-Knife/commits"))
+    requests.add("search", Scheduling(priority="bulk"),
+                 admit=lambda: governor.try_acquire("GET", "/search/repositories"))
+    start = time.monotonic()
+    requests.release.set()
+    wait_until(lambda: "search" in requests.granted)
+    assert time.monotonic() - start < 0.2
+    assert requests.run() == ["search", "commits"]
+    assert time.monotonic() - start >= 0.2
@@ -0,0 +1,113 @@
+# Copyright: 2024 Ibrahem Mouhamad
+
+from typing import Dict
+import base64
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+
+import pytest
+
+from snapshot import GunzipWriter, Snapshot
+
+SHA = "7fd1a60b01f91b314f59955a4e4d4e80d8edf11d"
+FILES = {"README": b"Hello World!\n", "docs/index.md": b"# Docs\n", "docs/guide.md": b""}
+
+
+def tarball(files: Dict[str, bytes] = FILES) -> bytes:
+    """
+    An archive laid out like the tarballs of GitHub: a global pax header recording the commit SHA,
+    and every path under `{owner}-{repo}-{sha}/`.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tarfile.PAX_FORMAT, pax_headers={"comment": SHA}) as archive:
+        root = f"octocat-Hello-World-{SHA[:7]}"
+        archive.addfile(directory(root))
+        for path in sorted({os.path.dirname(path) for path in files} - {""}):
+            archive.addfile(directory(f"{root}/{path}"))
+        for path, data in files.items():
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo(f"{root}/link")
+        link.type, link.linkname = tarfile.SYMTYPE, "README"
+        archive.addfile(link)
+    return buffer.getvalue()
+
+
+def directory(name: str) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(name)
+    info.type = tarfile.DIRTYPE
+    return info
+
+
+@pytest.fixture
+def snapshot(tmp_path) -> Snapshot:
+    path = tmp_path / "Hello-World.tar"
+    path.write_bytes(tarball())
+    snapshot = Snapshot(str(path))
+    yield snapshot
+    snapshot.close()
+
+
+def test_index(snapshot):
+    assert snapshot.sha == SHA
+    # the root, 3 files, `docs` and the symlink
+    assert len(snapshot) == 6
+    assert snapshot.entry("/docs/").type == "dir"
+    assert [entry.path for entry in snapshot.listdir("docs")] == ["docs/guide.md", "docs/index.md"]
+    assert [entry.path for entry in snapshot.listdir("")] == ["README", "docs", "link"]
+    assert snapshot.read("docs/index.md") == b"# Docs\n"
+    assert snapshot.read("docs/guide.md") == b""
+
+
+def test_file_contents(snapshot):
+    [content] = snapshot.contents("README")
+    assert content["type"] == "file" and content["size"] == 13
+    assert base64.b64decode(content["content"]) == FILES["README"]
+    # the git blob SHA, as `git hash-object README` gives
+    assert content["sha"] == hashlib.sha1(b"blob 13\0Hello World!\n").hexdigest() == "980a0d5f19a64b4b30a87d4206aade58726b60e3"
+    assert list(snapshot.contents("README", "raw")) == ["Hello World!\n"]
+
+
+def test_directory_contents(snapshot):
+    assert [content["name"] for content in snapshot.contents("docs")] == ["guide.md", "index.md"]
+    [content] = snapshot.contents("docs", "object")
+    assert content["type"] == "dir"
+    assert [entry["path"] for entry in content["entries"]] == ["docs/guide.md", "docs/index.md"]
+    with pytest.raises(Exception, match="^415"):
+        list(snapshot.contents("docs", "raw"))
+    assert list(snapshot.contents("link")) == [{"type": "symlink", "name": "link", "path": "link", "size": 0, "target": "README"}]
+
+
+def test_missing_path_raises_when_consumed(snapshot):
+    contents = snapshot.contents("missing")
+    with pytest.raises(Exception, match='^404 .*"path": "missing"'):
+        next(contents)
+    with pytest.raises(Exception, match="^404"):
+        snapshot.read("docs")
+
+
+def test_close_removes_the_temporary_directory(tmp_path):
+    directory = tmp_path / "snapshot"
+    directory.mkdir()
+    (directory / "archive.tar").write_bytes(tarball())
+    snapshot = Snapshot(str(directory / "archive.tar"), str(directory))
+    snapshot.close()
+    assert not directory.exists()
+    with pytest.raises(AssertionError, match="snapshot is closed"):
+        snapshot.read("README")
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_gunzip_writer(compress):
+    data = tarball()
+    output = io.BytesIO()
+    writer = GunzipWriter(output)
+    body = gzip.compress(data) if compress else data
+    for start in range(0, len(body), 100):
+        writer.write(body[start:start + 100])
+    writer.flush()
+    assert output.getvalue() == data
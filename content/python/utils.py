@@ -1,15 +1,31 @@
 # Copyright: 2024 Ibrahem Mouhamad
 
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 from datetime import datetime
+import re
 
-import urllib
+import urllib.parse
 
 
 import logging
 logger = logging.getLogger('my_logger')
 
-logging.basicConfig()
+
+_LINK_PATTERN = re.compile(r'<([^>]*)>\s*;\s*rel="([^"]*)"')
+_PAGE_PATTERN = re.compile(r'[?&]page=(\d+)')
+
+
+def encode_parameters(parameters: Dict[str, Any]) -> str:
+    """
+    Encode query parameters, list values are repeated for each of their items.
+
+    :param parameters: A dictionary of parameters.
+    :return: The encoded query string, without a leading `?`.
+    """
+    return urllib.parse.urlencode(
+        [(key, value) for key, values in parameters.items()
+         for value in (values if isinstance(values, list) else [values])]
+    )
 
 def add_parameters_to_url(
     url: str,
@@ -23,6 +39,12 @@ def add_parameters_to_url(
                        Existing parameters in the URL will be overwritten if they have the same keys.
     :return: The URL with the updated query parameters.
     """
+    # fast paths: nothing to add (e.g. `next` links), or no query to merge with
+    if not parameters:
+        return url
+    if "?" not in url and "#" not in url:
+        return f"{url}?{encode_parameters(parameters)}"
+
     scheme, netloc, url, params, query, fragment = urllib.parse.urlparse(url)
     url_params = urllib.parse.parse_qs(query)
     # union parameters in url with given parameters, the latter have precedence
@@ -36,23 +58,60 @@ def add_parameters_to_url(
     else:
         return f"{url}?{urllib.parse.urlencode(parameter_list)}"
 
+class UrlTemplate:
+    """
+    An endpoint URL with its query string encoded once.
+
+    Building the URL of a request from a template is a plain string concatenation,
+    no parsing and re-encoding of an existing query string is involved.
+    """
+
+    def __init__(self, path: str, parameters: Optional[Dict[str, Any]] = None):
+        """
+        :param path: The endpoint path relative to the API, e.g. `/repos/{owner}/{repo}/commits`,
+                     without query string; query parameters are only given with `parameters`.
+        :param parameters: Query parameters added to the path.
+        """
+        assert path.startswith("/"), path
+        assert "?" not in path and "#" not in path, path
+        self.path = path
+        self.query = encode_parameters(parameters) if parameters else ""
+        self.url = f"{path}?{self.query}" if self.query else path
+
+    def __str__(self) -> str:
+        return self.url
+
 def parseLinkHeader(headers: Dict[str, Union[str, int]]) -> Dict[str, str]:
     """
     Parse the `Link` header from HTTP response headers.
 
+    All relations are returned, a link with several space-separated relations
+    (e.g. `rel="next last"`) is registered under each of them.
+
     :param headers: A dictionary containing HTTP response headers.
-    :return: A dictionary mapping relation types (e.g., "next", "prev") to URLs.
+    :return: A dictionary mapping relation types (e.g., "next", "prev", "last") to URLs.
     """
+    link = headers.get("link")
+    if not link or not isinstance(link, str):
+        return {}
     links = {}
-    if "link" in headers and isinstance(headers["link"], str):
-        linkHeaders = headers["link"].split(", ")
-        for linkHeader in linkHeaders:
-            url, rel, *rest = linkHeader.split("; ")
-            url = url[1:-1]
-            rel = rel[5:-1]
+    for url, rels in _LINK_PATTERN.findall(link):
+        for rel in rels.split():
             links[rel] = url
     return links
 
+def pageNumber(url: Optional[str]) -> Optional[int]:
+    """
+    Extract the `page` query parameter from a URL.
+
+    :param url: A (pagination) URL, e.g. the `last` relation of the `Link` header.
+    :return: The page number, or None if the URL has no `page` parameter.
+    """
+    if not url:
+        return None
+    match = _PAGE_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
 def is_iso_format(date_string):
     # Attempt to parse the string using the ISO 8601 format
     try: